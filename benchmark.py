@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from main import Agent, EMAS, benchmarks, random_population, run_settings, settings
+from population import Population
+
+benchmark_settings = {
+    "dimensionsGrid": (10, 100, 1000, 10000, 100000),
+    "agentsGrid": (20, 100, 1000, 5000),
+    # every case is called until it took minTime seconds and at least
+    # minCalls times, or maxCalls times
+    "minTime": 0.2,
+    "minCalls": 5,
+    "maxCalls": 1000,
+    # cells whose genotypes take more memory are skipped
+    "maxGenotypeBytes": 2**28
+}
+
+PERCENTILES = (50, 90, 99)
+
+
+def measure(call, setup, evaluations, config):
+    """Latency percentiles of calls of ``call``, each after an untimed
+    ``setup`` if given, and the evaluations per second of calls making
+    ``evaluations`` fitness evaluations each."""
+    latencies = []
+    while (len(latencies) < config["minCalls"] or sum(latencies) < config["minTime"]) \
+            and len(latencies) < config["maxCalls"]:
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start_time)
+
+    latencies = np.array(latencies)
+    summary = {"calls": len(latencies), "mean": float(np.mean(latencies)), "min": float(np.min(latencies))}
+    for percentile, latency in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        summary[f"p{percentile}"] = float(latency)
+    summary["evaluations_per_second"] = None
+    if evaluations:
+        summary["evaluations_per_second"] = evaluations * len(latencies) / float(np.sum(latencies))
+    return summary
+
+
+def function_cases(dimensions, agents, rng):
+    for name, benchmark in benchmarks.items():
+        x = rng.uniform(benchmark.LB, benchmark.UB, (agents, dimensions))
+        yield f"function.{name}", lambda func_batch=benchmark.func_batch, x=x: func_batch(x), None, agents
+
+
+def agent_cases(emas):
+    config = emas.config
+    population = emas.population
+    energy = population.energy.copy()
+    lowerBound, upperBound = emas.lowerBound, emas.upperBound
+    x = population.x.copy()
+    x1, x2 = np.split(x[:len(x) // 2 * 2], 2)
+    agents1, agents2 = np.split(emas.rng.permutation(len(population))[:len(population) // 2 * 2], 2)
+
+    def reset_energy():
+        population.energy[:] = energy
+
+    yield "Agent.crossover", lambda: Agent.crossover(x1, x2, config, lowerBound, upperBound, emas.rng), None, None
+    yield "Agent.mutate", lambda: Agent.mutate(x, config, lowerBound, upperBound, emas.rng), None, None
+    yield "Agent.fight", lambda: Agent.fight(
+        population, agents1[0], agents2[0], config["fightLossEnergy"], config), reset_energy, None
+    yield "Agent.fights", lambda: Agent.fights(
+        population, agents1, agents2, config["fightLossEnergy"], config), reset_energy, None
+
+
+def emas_cases(emas):
+    population = emas.population
+    x, energy, fitness = population.x.copy(), population.energy.copy(), population.fitness.copy()
+    terms = None if population.terms is None else population.terms.copy()
+
+    def reset_energy():
+        emas.population.energy[:] = energy
+
+    def reproduce():
+        *_, wait = emas.reproduce()
+        wait()
+
+    def reset_population():
+        # every other agent died in a fight
+        emas.population = Population(x, np.where(np.arange(len(x)) % 2, energy, 0), fitness, terms,
+                                     energy_scale=population.energy_scale, projection=population.projection)
+        emas.statistics.reset(emas.population)
+
+    # every agent has the energy to reproduce
+    yield "EMAS.reproduce", reproduce, reset_energy, len(x) // 2 * 2
+    yield "EMAS.fight", emas.fight, reset_energy, None
+    yield "EMAS.clear", emas.clear, reset_population, None
+
+
+def benchmark_cell(config, dimensions, agents, rng):
+    """Results of every case with ``agents`` genotypes of ``dimensions``."""
+    results = {}
+    for name, *case in function_cases(dimensions, agents, rng):
+        results[name] = measure(*case, config)
+
+    emas_config = {**config, "dimensions": dimensions, "numberOfAgents": agents,
+                   "startEnergy": 2 * config["reproduceReqEnergy"],
+                   "statisticsEvaluationInterval": None, "statisticsIterationInterval": None,
+                   "seed": int(rng.integers(2**63))}
+    with tempfile.TemporaryDirectory() as telemetry_directory:
+        emas = EMAS(emas_config, telemetry_directory)
+        emas.setPopulation(random_population(emas_config, emas.lowerBound, emas.upperBound, emas.rng))
+        emas.evaluationBudget = sys.maxsize
+        for cases in (agent_cases(emas), emas_cases(emas)):
+            for name, *case in cases:
+                results[name] = measure(*case, config)
+        emas.close()
+    return results
+
+
+def run_benchmarks(config=None):
+    """Time the EMAS hot paths over the grid of ``dimensionsGrid`` by
+    ``agentsGrid`` and return the results as a JSON-serialisable dict.
+
+    :param config: Overrides of ``settings``, ``run_settings`` and
+        ``benchmark_settings``.
+    """
+    config = {**settings, **run_settings, **benchmark_settings, **(config or {})}
+    rng = np.random.default_rng(config["seed"])
+
+    results = []
+    for dimensions in config["dimensionsGrid"]:
+        for agents in config["agentsGrid"]:
+            cell = {"dimensions": dimensions, "agents": agents}
+            if agents * dimensions * 8 > config["maxGenotypeBytes"]:
+                results.append({**cell, "skipped": "maxGenotypeBytes"})
+                continue
+
+            for name, summary in benchmark_cell(config, dimensions, agents, rng).items():
+                results.append({"name": name, **cell, **summary})
+                if config["verbose"]:
+                    print(format_result(results[-1]))
+
+    return {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results
+    }
+
+
+def format_result(result):
+    line = f'{result["name"]:<18} D={result["dimensions"]:<6} N={result["agents"]:<5}'
+    line += " ".join(f' p{percentile}={result[f"p{percentile}"] * 1e3:10.4f} ms' for percentile in PERCENTILES)
+    if result["evaluations_per_second"] is not None:
+        line += f' {result["evaluations_per_second"]:12.1f} evals/s'
+    return line
+
+
+def compare(baseline, current, tolerance=0.1):
+    """Cases of ``current`` whose median latency grew by more than
+    ``tolerance`` over ``baseline``, as (name, dimensions, agents, ratio)."""
+    def medians(results):
+        return {(result["name"], result["dimensions"], result["agents"]): result["p50"]
+                for result in results["results"] if "skipped" not in result}
+
+    baseline_medians = medians(baseline)
+    regressions = []
+    for key, median in medians(current).items():
+        if key in baseline_medians and median > baseline_medians[key] * (1 + tolerance):
+            regressions.append((*key, median / baseline_medians[key]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dimensions", type=int, nargs="+", help="dimensions of the grid")
+    parser.add_argument("--agents", type=int, nargs="+", help="numbers of agents of the grid")
+    parser.add_argument("--min-time", type=float, help="seconds spent on every case")
+    parser.add_argument("--output", help="JSON file of the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare the run with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed growth of the median latency")
+    args = parser.parse_args()
+
+    overrides = {"verbose": True}
+    if args.dimensions:
+        overrides["dimensionsGrid"] = args.dimensions
+    if args.agents:
+        overrides["agentsGrid"] = args.agents
+    if args.min_time is not None:
+        overrides["minTime"] = args.min_time
+
+    results = run_benchmarks(overrides)
+
+    output = args.output or f"results/benchmark_{results['time']}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print("Results saved to", output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), results, args.tolerance)
+        for name, dimensions, agents, ratio in regressions:
+            print(f"Regression: {name} D={dimensions} N={agents} is {ratio:.2f}x slower")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+METADATA = "checkpoint_metadata"
+
+
+def _flatten(state, prefix=""):
+    arrays, metadata = {}, {}
+    for key, value in state.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            nested_arrays, nested_metadata = _flatten(value, name + ".")
+            arrays.update(nested_arrays)
+            metadata.update(nested_metadata)
+        elif isinstance(value, np.ndarray):
+            arrays[name] = value
+        else:
+            metadata[name] = value
+    return arrays, metadata
+
+
+def _unflatten(values):
+    state = {}
+    for name, value in values.items():
+        *path, key = name.split(".")
+        node = state
+        for part in path:
+            node = node.setdefault(part, {})
+        node[key] = value
+    return state
+
+
+def write_checkpoint(path, state):
+    """Write the nested dict ``state`` of arrays and JSON values to ``path``
+    as one uncompressed ``.npz`` file, replacing the previous checkpoint
+    atomically."""
+    arrays, metadata = _flatten(state)
+    arrays[METADATA] = np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8)
+
+    with open(path + ".tmp", "wb") as file:
+        np.savez(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def read_checkpoint(path):
+    with np.load(path) as data:
+        values = {name: data[name] for name in data.files}
+    values.update(json.loads(values.pop(METADATA).tobytes()))
+    return _unflatten(values)
+
+
+class Checkpointer:
+    """Checkpoints of a run every ``interval`` evaluations.
+
+    The state is copied by the caller and written in a background thread
+    while the run goes on, at most one write is in flight. Errors of a
+    write are raised by the next ``save`` or ``wait``."""
+
+    def __init__(self, path, interval, evaluations=0):
+        self.path = path
+        self.interval = interval
+        self.next_checkpoint = (evaluations // interval + 1) * interval
+        self.thread = None
+        self.error = None
+
+    def due(self, evaluations):
+        return evaluations >= self.next_checkpoint
+
+    def save(self, state, evaluations):
+        self.wait()
+        self.next_checkpoint = (evaluations // self.interval + 1) * self.interval
+        self.thread = threading.Thread(target=self._write, args=(state,))
+        self.thread.start()
+
+    def _write(self, state):
+        try:
+            write_checkpoint(self.path, state)
+        except Exception as e:
+            self.error = e
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
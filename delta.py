@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class Descent:
+    """Where the genes of a batch of newborns come from.
+
+    Newborn ``i`` is a copy of agent ``parents[i]`` but for the genes
+    ``segments[i, 0]:segments[i, 1]``, copied from agent ``others[i]``, and
+    the new genes ``mutated_genes[k]`` of newborns ``mutated[k]``."""
+
+    def __init__(self, parents, others, segments, mutated=None, mutated_genes=None):
+        self.parents = parents
+        self.others = others
+        self.segments = segments
+        self.mutated = np.empty(0, dtype=np.intp) if mutated is None else mutated
+        self.mutated_genes = np.empty(0, dtype=np.intp) if mutated_genes is None else mutated_genes
+
+    def __len__(self):
+        return len(self.parents)
+
+    def subset(self, newborns):
+        """Descent of the newborns with the indices ``newborns``."""
+        position = np.full(len(self.parents), -1)
+        position[newborns] = np.arange(len(newborns))
+        kept = position[self.mutated] >= 0
+        return Descent(self.parents[newborns], self.others[newborns],
+                       None if self.segments is None else self.segments[newborns],
+                       position[self.mutated[kept]], self.mutated_genes[kept])
+
+
+class DeltaEvaluator:
+    """Incremental evaluation of separable functions
+    ``f(x) = offset(D) + sum_j terms(x_j)``.
+
+    A newborn of a two-point crossover copies its parent's genes but for a
+    segment copied from the other parent and a few mutated genes. Its terms
+    start as a copy of the parent's, and only the segment's terms and the
+    mutated genes change it, so the fitness of a newborn with k mutated
+    genes costs O(k) evaluated terms and one pass over the segment. Every
+    ``refresh_interval`` delta evaluations the population's terms and
+    fitness are recomputed from the genotypes to bound floating-point drift.
+
+    :param terms: Per-coordinate contributions of a batch of genotypes.
+    :param offset: Constant part of the function for a given dimension.
+    :param refresh_interval: Delta evaluations between full re-evaluations.
+    """
+
+    def __init__(self, terms, offset, refresh_interval=1000):
+        self.terms = terms
+        self.offset = offset
+        self.refresh_interval = refresh_interval
+        self.evaluations_since_refresh = 0
+
+    def evaluate(self, x):
+        terms = self.terms(x)
+        return self.offset(x.shape[1]) + np.sum(terms, axis=1), terms
+
+    def evaluate_newborns(self, population, newborns, descent):
+        """Fitness and terms of ``newborns`` from those of the agents they
+        descend from, see ``Descent``."""
+        terms = population.terms[descent.parents]
+        fitness = population.fitness[descent.parents]
+
+        for i, (start, stop) in enumerate(descent.segments):
+            if start < stop:
+                segment_terms = population.terms[descent.others[i], start:stop]
+                fitness[i] += np.sum(segment_terms) - np.sum(terms[i, start:stop])
+                terms[i, start:stop] = segment_terms
+
+        mutated, genes = descent.mutated, descent.mutated_genes
+        if len(mutated):
+            mutated_terms = self.terms(newborns[mutated, genes])
+            np.add.at(fitness, mutated, mutated_terms - terms[mutated, genes])
+            terms[mutated, genes] = mutated_terms
+        self.evaluations_since_refresh += len(newborns)
+
+        return fitness, terms
+
+    def refresh(self, population, force=False):
+        if not force and self.evaluations_since_refresh < self.refresh_interval:
+            return
+
+        population.fitness[:], population.terms[:] = self.evaluate(population.x)
+        self.evaluations_since_refresh = 0
@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+# Energy is held as int64 units of 10**-deathThreshold, so transfers between
+# agents move whole units and the total energy is conserved exactly. An agent
+# with less than one unit left has no energy and dies, as when the float
+# energy was truncated to deathThreshold decimals.
+
+
+def energy_scale(settings):
+    return 10 ** settings["deathThreshold"]
+
+
+def to_units(energy, scale):
+    return np.floor(np.asarray(energy, dtype=float) * scale).astype(np.int64)
+
+
+def reproduction_loss(energy, loss_energy, scale):
+    """Units given up by parents with ``energy`` units: the fraction
+    ``loss_energy`` rounded up to whole energy, at most all of it."""
+    loss = np.ceil(energy * loss_energy / scale).astype(np.int64) * scale
+    return np.minimum(loss, energy)
+
+
+def fight_remainder(energy, loss_energy, d, crowding_factor):
+    """Units the loser of a fight with ``energy`` units keeps, the winner
+    gets the rest. Losers closer than ``crowding_factor`` to the winner
+    additionally lose all but ``d**2 / crowding_factor**2`` of it."""
+    remainder = math.floor(energy * (1 - loss_energy))
+    if d < crowding_factor:
+        remainder = math.floor(remainder * (d**2 / crowding_factor**2))
+    return remainder
+
+
+def fight_remainders(energy, loss_energy, d, crowding_factor):
+    """``fight_remainder`` of arrays of losers' energy and distances."""
+    remainder = np.floor(energy * (1 - loss_energy))
+    crowded = d < crowding_factor
+    remainder[crowded] = np.floor(remainder[crowded] * (d[crowded]**2 / crowding_factor**2))
+    return remainder.astype(np.int64)
+
+
+def redistribute(energy, units):
+    """Share ``units`` equally among the agents with ``energy``, in place.
+    The indivisible rest goes to the agent with the most energy."""
+    share, rest = divmod(int(units), len(energy))
+    energy += share
+    energy[np.argmax(energy)] += rest
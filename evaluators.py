@@ -0,0 +1,100 @@
+import math
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+
+def _done(fitness):
+    future = Future()
+    future.set_result(fitness)
+    return future
+
+
+def _chunks(x, chunk_size):
+    return [x[i:i + chunk_size] for i in range(0, len(x), chunk_size)]
+
+
+class _Batch:
+    """Fitness of a batch evaluated in chunks by several futures."""
+
+    def __init__(self, futures):
+        self.futures = futures
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def result(self):
+        if not self.futures:
+            return np.empty(0)
+        return np.concatenate([future.result() for future in self.futures])
+
+
+class SerialEvaluator:
+    """Evaluates the genotypes one at a time in the calling thread."""
+
+    def __init__(self, function_batch, workers=None, chunk_size=None):
+        self.function_batch = function_batch
+
+    def submit(self, x):
+        return _done(np.array([self.function_batch(x[i:i + 1])[0] for i in range(len(x))]))
+
+    def close(self):
+        pass
+
+
+class NumpyEvaluator:
+    """Evaluates the batch vectorised, ``chunk_size`` genotypes at a time to
+    bound the size of the temporaries."""
+
+    def __init__(self, function_batch, workers=None, chunk_size=None):
+        self.function_batch = function_batch
+        self.chunk_size = chunk_size
+
+    def submit(self, x):
+        if self.chunk_size is None or len(x) <= self.chunk_size:
+            return _done(np.asarray(self.function_batch(x), dtype=float))
+        return _done(np.concatenate([self.function_batch(chunk)
+                                     for chunk in _chunks(x, self.chunk_size)]))
+
+    def close(self):
+        pass
+
+
+class _PoolEvaluator:
+    executor_class = None
+
+    def __init__(self, function_batch, workers=None, chunk_size=None):
+        self.function_batch = function_batch
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.executor = self.executor_class(max_workers=self.workers)
+
+    def submit(self, x):
+        # by default every worker gets one chunk of the batch
+        chunk_size = self.chunk_size or max(1, math.ceil(len(x) / self.workers))
+        return _Batch([self.executor.submit(self.function_batch, chunk)
+                       for chunk in _chunks(x, chunk_size)])
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class ThreadEvaluator(_PoolEvaluator):
+    """Evaluates chunks of the batch on a thread pool, for objective
+    functions which release the GIL."""
+    executor_class = ThreadPoolExecutor
+
+
+class ProcessEvaluator(_PoolEvaluator):
+    """Evaluates chunks of the batch on a process pool, the function must be
+    picklable (defined at module level)."""
+    executor_class = ProcessPoolExecutor
+
+
+evaluators = {
+    "serial": SerialEvaluator,
+    "numpy": NumpyEvaluator,
+    "thread": ThreadEvaluator,
+    "process": ProcessEvaluator
+}
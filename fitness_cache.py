@@ -0,0 +1,147 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# rough size of an entry besides its terms: the key, the dict slot and the
+# boxed fitness
+ENTRY_OVERHEAD = 256
+KEY_BYTES = 16
+
+
+class FitnessCache:
+    """Fitness (and terms) of evaluated genotypes, least recently used
+    entries are evicted once the entries take more than ``max_bytes``.
+
+    Genotypes are keyed by a hash of their bytes, with ``quantum`` given
+    after rounding every gene to a multiple of it, so that genotypes closer
+    than the quantum share an entry.
+
+    :param max_bytes: Memory budget of the entries.
+    :param quantum: Resolution of the genes in the key, exact when None.
+    """
+
+    def __init__(self, max_bytes, quantum=None):
+        self.max_bytes = max_bytes
+        self.quantum = quantum
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits, self.misses = 0, 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def state(self):
+        keys = list(self.entries)
+        entries = list(self.entries.values())
+        terms = None
+        if entries and entries[0][1] is not None:
+            terms = np.array([entry[1] for entry in entries])
+        return {"keys": np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, KEY_BYTES),
+                "fitness": np.array([entry[0] for entry in entries]), "terms": terms,
+                "hits": self.hits, "misses": self.misses}
+
+    def restore(self, state):
+        self.entries.clear()
+        self.bytes = 0
+        for i, key in enumerate(state["keys"]):
+            self.put(key.tobytes(), state["fitness"][i], None if state["terms"] is None else state["terms"][i])
+        self.hits, self.misses = state["hits"], state["misses"]
+
+    def keys(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.quantum is None:
+            # -0.0 and 0.0 are the same gene
+            x = x + 0.0
+        else:
+            x = np.rint(x / self.quantum).astype(np.int64)
+        x = np.ascontiguousarray(x)
+        return [hashlib.blake2b(row.tobytes(), digest_size=KEY_BYTES).digest() for row in x]
+
+    def lookup(self, x):
+        """Keys, cached fitness (NaN for misses) and cached terms of the
+        genotypes of ``x``, and the indices of the genotypes to evaluate:
+        the first of every group of equal genotypes missing from the cache,
+        the others are filled in by ``complete``."""
+        keys = self.keys(x)
+        fitness = np.full(len(keys), np.nan)
+        terms = None
+        evaluate = {}
+        for i, key in enumerate(keys):
+            entry = self.entries.get(key)
+            if entry is None:
+                if key in evaluate:
+                    self.hits += 1
+                else:
+                    evaluate[key] = i
+                    self.misses += 1
+                continue
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            fitness[i] = entry[0]
+            if entry[1] is not None:
+                if terms is None:
+                    terms = np.empty((len(keys),) + entry[1].shape)
+                terms[i] = entry[1]
+
+        return keys, fitness, terms, np.fromiter(evaluate.values(), dtype=int, count=len(evaluate))
+
+    def complete(self, keys, fitness, terms, evaluate, evaluated_fitness, evaluated_terms=None):
+        """Cache the fitness and terms of the genotypes ``evaluate`` and
+        return the fitness and terms of every genotype of the lookup."""
+        fitness = fitness.copy()
+        if evaluated_terms is not None and terms is None:
+            terms = np.empty((len(keys),) + evaluated_terms.shape[1:])
+
+        evaluated = {}
+        for j, i in enumerate(evaluate):
+            evaluated[keys[i]] = j
+            self.put(keys[i], evaluated_fitness[j],
+                     None if evaluated_terms is None else evaluated_terms[j])
+
+        for i, key in enumerate(keys):
+            j = evaluated.get(key)
+            if j is not None:
+                fitness[i] = evaluated_fitness[j]
+                if evaluated_terms is not None:
+                    terms[i] = evaluated_terms[j]
+
+        return fitness, terms
+
+    def put(self, key, fitness, terms=None):
+        if terms is not None:
+            terms = np.array(terms)
+        size = ENTRY_OVERHEAD + (0 if terms is None else terms.nbytes)
+        if size > self.max_bytes:
+            return
+
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        self.entries[key] = (float(fitness), terms, size)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def submit(self, x, submit, count_hits=False):
+        """Start evaluating the genotypes of ``x`` missing from the cache.
+
+        :param submit: Called with the indices of the genotypes to evaluate,
+            returns a function waiting for their fitness and terms.
+        :param count_hits: Whether hits count as evaluations.
+        :return: Function waiting for the fitness and terms of all of ``x``
+            and the number of evaluations to count.
+        """
+        keys, fitness, terms, evaluate = self.lookup(x)
+        wait = submit(evaluate) if len(evaluate) else (lambda: (np.empty(0), None))
+        evaluations = len(keys) if count_hits else len(evaluate)
+
+        def result():
+            evaluated_fitness, evaluated_terms = wait()
+            return (*self.complete(keys, fitness, terms, evaluate,
+                                   np.asarray(evaluated_fitness, dtype=float), evaluated_terms),
+                    evaluations)
+        return result
@@ -1,20 +1,23 @@
 import math
-import random
-import copy
 
 import numpy as np
 from irace import irace
 
-from rastrigin import func
+from energy import fight_remainder, reproduction_loss, to_units
+from pairing import random_pairs
+from operators import polynomial_mutation, two_point_crossover
+from population import Population
+
+from rastrigin import func, func_batch
 from rastrigin import LB, UB
 
-# from sphere import func
+# from sphere import func, func_batch
 # from sphere import LB, UB
 
-# from schaffer import func
+# from schaffer import func, func_batch
 # from schaffer import LB, UB
 
-# from schwefel import func
+# from schwefel import func, func_batch
 # from schwefel import LB, UB
 
 DIM = 100
@@ -41,117 +44,33 @@ default_values = '''
 
 
 class Agent:
-    def __init__(self, x, settings, energy=None):
-        self.x = x
-        self.settings = settings
-
-        if energy is not None:
-            self.energy = energy
-        else:
-            self.energy = settings["start_energy"]
-
-        self.fitness = self.calculate_fitness()
-
-    def calculate_fitness(self):
-        return func(self.x)
-
     @staticmethod
-    def crossover(parent1, parent2):
-        parents = [parent1, parent2]
-        offspring = copy.deepcopy(parents)
-        permutation_length = len(offspring[0].x)
-
-        cross_points = sorted(
-            [random.randint(0, permutation_length) for _ in range(2)])
-
-        def _repeated(element, collection):
-            c = 0
-            for e in collection:
-                if e == element:
-                    c += 1
-            return c > 1
-
-        def _swap(data_a, data_b, cross_points):
-            c1, c2 = cross_points
-            new_a = data_a[:c1] + data_b[c1:c2] + data_a[c2:]
-            new_b = data_b[:c1] + data_a[c1:c2] + data_b[c2:]
-            return new_a, new_b
-
-        def _map(swapped, cross_points):
-            n = len(swapped[0])
-            c1, c2 = cross_points
-            s1, s2 = swapped
-            map_ = s1[c1:c2], s2[c1:c2]
-            for i_chromosome in range(n):
-                if not c1 < i_chromosome < c2:
-                    for i_son in range(2):
-                        while _repeated(swapped[i_son][i_chromosome], swapped[i_son]):
-                            try:
-                                map_index = map_[i_son].index(
-                                    swapped[i_son][i_chromosome])
-                                swapped[i_son][i_chromosome] = map_[
-                                    1 - i_son][map_index]
-                            except ValueError as ve:
-                                print('ValueError encountered, Action skipped')
-                                break
-            return s1, s2
-
-        swapped = _swap(parents[0].x, parents[1].x, cross_points)
-        mapped = _map(swapped, cross_points)
-
-        offspring[0].x, offspring[1].x = mapped
-
-        return offspring[0].x, offspring[1].x
+    def crossover(x1, x2, rng):
+        newborn_x1, newborn_x2 = x1.copy(), x2.copy()
+        two_point_crossover(newborn_x1, newborn_x2, rng=rng)
+
+        return newborn_x1, newborn_x2
 
     @staticmethod
-    def mutate(x, settings):
-        for i in range(len(x)):
-            rand = random.random()
-
-            if rand <= 1 / len(x):
-                y = x[i]
-                yl, yu = LB, UB
-
-                if yl == yu:
-                    y = yl
-                else:
-                    delta1 = (y - yl) / (yu - yl)
-                    delta2 = (yu - y) / (yu - yl)
-                    rnd = random.random()
-                    mut_pow = 1.0 / (settings["distribution_index"] + 1.0)
-                    if rnd <= 0.5:
-                        xy = 1.0 - delta1
-                        val = 2.0 * rnd + (1.0 - 2.0 * rnd) * (
-                            pow(xy, settings["distribution_index"] + 1.0))
-                        deltaq = pow(val, mut_pow) - 1.0
-                    else:
-                        xy = 1.0 - delta2
-                        val = 2.0 * (1.0 - rnd) + 2.0 * (rnd - 0.5) * (
-                            pow(xy, settings["distribution_index"] + 1.0))
-                        deltaq = 1.0 - pow(val, mut_pow)
-
-                    y += deltaq * (yu - yl)
-                    if y < LB:
-                        y = LB
-                    if y > UB:
-                        y = UB
-                x[i] = y
+    def mutate(x, settings, rng):
+        polynomial_mutation(x, LB, UB, settings["distribution_index"], rng=rng)
         return x
 
     @staticmethod
-    def reproduce(parent1, parent2, loss_energy, f_avg, settings):
-        parent1_loss = math.ceil(parent1.energy * loss_energy)
-        parent1.energy -= parent1_loss
+    def reproduce(population, parent1, parent2, loss_energy, f_avg, settings, rng):
+        energy = population.energy
+
+        parent1_loss = reproduction_loss(energy[parent1], loss_energy, population.energy_scale)
+        energy[parent1] -= parent1_loss
 
-        parent2_loss = math.ceil(parent2.energy * loss_energy)
-        parent2.energy -= parent2_loss
+        parent2_loss = reproduction_loss(energy[parent2], loss_energy, population.energy_scale)
+        energy[parent2] -= parent2_loss
 
-        if random.random() < settings["crossover_probability"]:
-            newborns = Agent.crossover(parent1, parent2)
-            newborn_x1, newborn_x2 = newborns[0], newborns[1]
+        x1, x2 = population.x[parent1], population.x[parent2]
+        if rng.random() < settings["crossover_probability"]:
+            newborn_x1, newborn_x2 = Agent.crossover(x1, x2, rng)
         else:
-            newborns = Agent.crossover(parent2, parent1)
-            newborn_x1, newborn_x2 = newborns[0], newborns[1]
+            newborn_x1, newborn_x2 = Agent.crossover(x2, x1, rng)
 
         mutation_probability_x1 = mutation_probability_x2 = settings["mutation_probability"]
 
@@ -165,114 +84,94 @@ class Agent:
         else:
             mutation_probability_x2 *= 2
 
-        random_number = random.random()
+        random_number = rng.random()
         if random_number < mutation_probability_x1:
-            newborn_x1 = Agent.mutate(newborn_x1, settings)
+            newborn_x1 = Agent.mutate(newborn_x1, settings, rng)
         if random_number < mutation_probability_x2:
-            newborn_x2 = Agent.mutate(newborn_x2, settings)
+            newborn_x2 = Agent.mutate(newborn_x2, settings, rng)
 
-        newborn1 = Agent(newborn_x1, settings, parent1_loss + parent2_loss)
-        newborn2 = Agent(newborn_x2, settings, parent1_loss + parent2_loss)
-
-        return newborn1 if newborn1.fitness < newborn2.fitness else newborn2
+        return newborn_x1, newborn_x2, parent1_loss + parent2_loss
 
     @staticmethod
-    def fight(agent_1, agent_2, loss_energy, death_threshold, crowding_factor):
-        d = np.sum(np.abs(np.array(agent_1.x) - np.array(agent_2.x)))
-        if agent_1.fitness < agent_2.fitness:
-            energy = agent_2.energy * loss_energy
-            agent_1.energy += energy
-            agent_2.energy -= energy
-            if d < crowding_factor:
-                energy = agent_2.energy * (1-d**2/crowding_factor**2)
-                agent_1.energy += energy
-                agent_2.energy -= energy
-        else:
-            energy = agent_1.energy * loss_energy
-            agent_1.energy -= energy
-            agent_2.energy += energy
-            if d < crowding_factor:
-                energy = agent_1.energy * (1-d**2/crowding_factor**2)
-                agent_1.energy -= energy
-                agent_2.energy += energy
+    def fight(population, agent_1, agent_2, loss_energy, crowding_factor):
+        energy, fitness = population.energy, population.fitness
 
-        agent_1.energy = np.true_divide(
-            np.floor(agent_1.energy * 10**death_threshold), 10**death_threshold)
-        agent_2.energy = np.true_divide(
-            np.floor(agent_2.energy * 10**death_threshold), 10**death_threshold)
+        d = float(np.sum(np.abs(population.x[agent_1] - population.x[agent_2])))
+        if fitness[agent_1] < fitness[agent_2]:
+            winner, loser = agent_1, agent_2
+        else:
+            winner, loser = agent_2, agent_1
 
-    def is_dead(self):
-        return self.energy <= 0
+        loser_energy = int(energy[loser])
+        transfer = loser_energy - fight_remainder(loser_energy, loss_energy, d, crowding_factor)
+        energy[winner] += transfer
+        energy[loser] -= transfer
 
 
 class EMAS:
-    def __init__(self, seed, agents, settings):
-        self.seed = seed
-        self.agents = agents
+    def __init__(self, rng, population, settings):
+        self.rng = rng
+        self.population = population
         self.settings = settings
 
     def run_iteration(self):
-        random.shuffle(self.agents)
-
-        children = self.reproduce()
+        children_x, children_energy, children_fitness = self.reproduce()
         self.fight()
-        self.agents.extend(children)
+        self.population.extend(children_x, children_energy, children_fitness)
         self.clear()
 
     def reproduce(self):
-        req_energy = self.settings["reproduce_req_energy"]
+        req_energy = to_units(self.settings["reproduce_req_energy"], self.population.energy_scale)
         loss_energy = self.settings["reproduce_loss_energy"]
+        f_avg = np.average(self.population.fitness)
+
+        parents1, parents2 = random_pairs(
+            np.flatnonzero(self.population.energy > req_energy), self.rng)
+
+        offspring = [Agent.reproduce(self.population, parent1, parent2, loss_energy,
+                                     f_avg, self.settings, self.rng)
+                     for parent1, parent2 in zip(parents1, parents2)]
+
+        if not offspring:
+            return np.empty((0, self.population.dimensions)), np.empty(0), np.empty(0)
+
+        newborns_x1, newborns_x2, energy = map(np.array, zip(*offspring))
+        fitness1, fitness2 = np.split(
+            func_batch(np.vstack([newborns_x1, newborns_x2])), 2)
 
-        parents = []
-        children = []
-        for idx, parent1 in enumerate(self.agents):
-            if parent1.energy > req_energy and parent1 not in parents:
-                available_parents = [agent for agent in self.agents if
-                                     agent != parent1 and agent.energy > req_energy and agent not in parents]
-                if available_parents:
-                    parent2 = random.choice(available_parents)
-                    children.append(Agent.reproduce(parent1, parent2, loss_energy,
-                                                    np.average(
-                                                        [agent.fitness for agent in self.agents]),
-                                                    self.settings))
-                    parents.extend([parent1, parent2])
-
-        return children
+        better = fitness1 < fitness2
+        return (np.where(better[:, np.newaxis], newborns_x1, newborns_x2),
+                energy, np.where(better, fitness1, fitness2))
 
     def fight(self):
         loss_energy = self.settings["fight_loss_energy"]
-        death_threshold = self.settings["death_threshold"]
         crowding_factor = self.settings["crowding_factor"]
 
-        fighters = []
-        for idx, agent1 in enumerate(self.agents):
-            if agent1 not in fighters:
-                available_fighters = [
-                    agent for agent in self.agents if agent != agent1 and agent not in fighters]
-                if available_fighters:
-                    agent2 = random.choice(available_fighters)
-                    Agent.fight(agent1, agent2, loss_energy,
-                                death_threshold, crowding_factor)
-                    fighters.extend([agent1, agent2])
+        for agent1, agent2 in zip(*random_pairs(len(self.population), self.rng)):
+            Agent.fight(self.population, agent1, agent2, loss_energy, crowding_factor)
 
     def clear(self):
-        self.agents = [agent for agent in self.agents if not agent.is_dead()]
+        self.population.compact(self.population.energy > 0)
 
 
-def generate_agents(settings):
-    return [Agent([random.uniform(LB, UB) for _ in range(DIM)], settings) for _ in range(numberOfAgents)]
+def generate_population(settings, rng):
+    x = rng.uniform(LB, UB, (numberOfAgents, DIM))
+    # energy is held in units of 10**-death_threshold, see energy.py
+    scale = 10 ** settings["death_threshold"]
+    return Population(x, to_units(settings["start_energy"], scale), func_batch(x), energy_scale=scale)
 
 
 def optimize(seed, config):
-    agents = generate_agents(config)
-    emas = EMAS(seed, agents, config)
+    # every experiment runs on its own stream seeded by irace
+    rng = np.random.default_rng(seed)
+    emas = EMAS(rng, generate_population(config, rng), config)
 
     for _ in range(numberOfIterations):
         emas.run_iteration()
 
-    best_agent = min(
-        emas.agents, key=lambda agent: agent.fitness, default=None)
-    return math.inf if best_agent is None else best_agent.fitness
+    if len(emas.population) == 0:
+        return math.inf
+    return emas.population.fitness[emas.population.best()]
 
 
 def target_runner(experiment, scenario, lb=LB, ub=UB):
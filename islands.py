@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+
+from energy import to_units
+from main import EMAS, Result, benchmarks, random_population, run_settings, settings
+from termination import TargetFitness, Termination, TimeBudget, termination_criteria
+
+island_settings = {
+    "islands": os.cpu_count() or 1,
+    "topology": "ring",
+    # agents leave every island every migrationInterval iterations
+    "migrationInterval": 10,
+    "migrationSize": 2
+}
+
+# reasons ending the whole run when one island reaches them, the other
+# criteria only end the island
+RUN_REASONS = (TimeBudget.reason, TargetFitness.reason)
+
+
+def ring_targets(island, islands, count, rng):
+    return np.full(count, (island + 1) % islands)
+
+
+def fully_connected_targets(island, islands, count, rng):
+    if count == 0 or islands == 1:
+        return np.empty(0, dtype=int)
+    others = np.delete(np.arange(islands), island)
+    return rng.choice(others, count)
+
+
+def random_targets(island, islands, count, rng):
+    # all migrants of an epoch go to one island drawn anew every epoch
+    if count == 0 or islands == 1:
+        return np.empty(0, dtype=int)
+    others = np.delete(np.arange(islands), island)
+    return np.full(count, rng.choice(others))
+
+
+topologies = {
+    "ring": ring_targets,
+    "fully_connected": fully_connected_targets,
+    "random": random_targets
+}
+
+
+class IslandsResult:
+    def __init__(self, results, time):
+        self.results = results
+        self.time = time
+        self.evaluations = sum(result.evaluations for result in results)
+        self.best = min(results, key=lambda result: result.best_fitness)
+
+
+def run_island(island, config, seed_sequence, inboxes, results):
+    """Put the ``Result`` of ``evolve_island`` on ``results``, or the error
+    it raised, in which case the other islands are told to stop."""
+    try:
+        result = evolve_island(island, config, seed_sequence, inboxes)
+    except Exception as e:
+        for other in range(len(inboxes)):
+            if other != island:
+                inboxes[other].put((None, island))
+        results.put((island, e))
+        return
+    if result is not None:
+        results.put((island, result))
+
+
+def evolve_island(island, config, seed_sequence, inboxes):
+    """Run one island until every island has used its share of the budget
+    and return its ``Result``, or None when another island failed.
+
+    Islands work in epochs of ``migrationInterval`` iterations. After every
+    epoch each island sends one message to every other island, with the
+    migrants addressed to it (possibly none) and the reason it has finished
+    (None while it has not), and then reads the messages of that epoch from
+    every other island. The run ends after the epoch in which every island
+    has finished or one of them reached a criterion of ``RUN_REASONS``.
+    Queues do not order messages of different senders, so messages of a
+    later epoch are kept until the island gets there, and migrants are
+    taken in by sender to keep seeded runs reproducible."""
+    islands = len(inboxes)
+    # the first islands make one evaluation more when the budget is uneven
+    max_evaluations = config["maxNumberOfFitnessEvaluations"]
+    budget = max_evaluations // islands + (island < max_evaluations % islands)
+    start_time = time.time()
+
+    emas = EMAS(config, f'{config["telemetryDirectory"]}_island_{island}', seed_sequence)
+    emas.evaluationBudget = budget
+    emas.setPopulation(random_population(config, emas.lowerBound, emas.upperBound, emas.rng))
+    # a finished island may still be revived by immigrants
+    termination = Termination(termination_criteria(
+        {**config, "maxNumberOfFitnessEvaluations": budget},
+        to_units(config["reproduceReqEnergy"], emas.energyScale)))
+
+    epoch = 0
+    early_messages = []
+    while True:
+        done = termination.done(emas)
+        for _ in range(config["migrationInterval"]):
+            if done:
+                break
+            emas.run_iteration()
+            done = termination.done(emas)
+        reason = termination.reason if done else None
+
+        # at least two agents stay so that the island can still fight
+        count = min(config["migrationSize"], len(emas.population) - 2) if islands > 1 else 0
+        leaving = emas.rng.choice(len(emas.population), max(count, 0), replace=False)
+        targets = topologies[config["topology"]](island, islands, len(leaving), emas.rng)
+        x, energy, fitness, terms = emas.emigrate(leaving)
+
+        for other in range(islands):
+            if other != island:
+                to = targets == other
+                inboxes[other].put((epoch, island, reason, x[to], energy[to], fitness[to],
+                                    None if terms is None else terms[to]))
+
+        messages = [message for message in early_messages if message[0] == epoch]
+        early_messages = [message for message in early_messages if message[0] != epoch]
+        while len(messages) < islands - 1:
+            message = inboxes[island].get()
+            if message[0] is None:
+                emas.close()
+                return None
+            (messages if message[0] == epoch else early_messages).append(message)
+
+        reasons = [reason]
+        for _, _, other_reason, *migrants in sorted(messages, key=lambda message: message[1]):
+            emas.immigrate(*migrants)
+            reasons.append(other_reason)
+        run_reasons = [other_reason for other_reason in reasons if other_reason in RUN_REASONS]
+        if run_reasons or None not in reasons:
+            break
+        epoch += 1
+
+    emas.close()
+    result = Result(config, benchmarks[config["function"]].funcName, emas,
+                    emas.data.directory, time.time() - start_time)
+    result.termination_reason = run_reasons[0] if run_reasons else reason
+    return result
+
+
+def run_islands(config=None):
+    """Run ``islands`` EMAS populations in separate processes, migrating
+    agents between them, and return an ``IslandsResult``.
+
+    ``maxNumberOfFitnessEvaluations`` is the budget of the whole run, shared
+    evenly by the islands, and ``numberOfAgents`` the initial size of every
+    island. Every island gets its own child of the run's ``SeedSequence``.
+
+    ``maxTime`` and ``targetFitness`` end the whole run once one island
+    reaches them. Stagnation, a stall or a saturated fitness cache only end
+    the island, which leaves the rest of its share of the budget unused.
+
+    :param config: Overrides of ``settings``, ``run_settings`` and
+        ``island_settings``.
+    """
+    config = {**settings, **run_settings, **island_settings, **(config or {})}
+    if config["topology"] not in topologies:
+        raise ValueError(f'Unknown topology: {config["topology"]}')
+
+    start_time = time.time()
+    if config["telemetryDirectory"] is None:
+        config["telemetryDirectory"] = \
+            "results/"+benchmarks[config["function"]].funcName+"_"+str(start_time)+"_telemetry"
+
+    seed_sequences = np.random.SeedSequence(config["seed"]).spawn(config["islands"])
+    inboxes = [multiprocessing.Queue() for _ in range(config["islands"])]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_island,
+                                         args=(island, config, seed_sequences[island], inboxes, results))
+                 for island in range(config["islands"])]
+    for process in processes:
+        process.start()
+
+    island_results = [None] * len(processes)
+    try:
+        for _ in processes:
+            island, result = wait_result(results, processes)
+            if isinstance(result, Exception):
+                raise result
+            island_results[island] = result
+    except BaseException:
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+
+    return IslandsResult(island_results, time.time() - start_time)
+
+
+def wait_result(results, processes):
+    """Next ``(island, result)`` of ``results``, the islands are checked
+    every second for having died without one."""
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            for island, process in enumerate(processes):
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError(f"Island {island} exited with code {process.exitcode}")
+
+
+if __name__ == "__main__":
+    result = run_islands()
+
+    for island, island_result in enumerate(result.results):
+        print(f"Island {island}: {island_result.agents} agents, {island_result.evaluations} evaluations, "
+              f"best fitness {island_result.best_fitness:.2f}, stopped by {island_result.termination_reason}")
+    print()
+    print("Total number of fitness evaluations:", result.evaluations)
+    print(f"Best fitness: {result.best.best_fitness:.2f} in {result.time:.2f} seconds")
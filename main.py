@@ -1,412 +1,587 @@
-import json
-import math
-import random
-import copy
+import argparse
 import time
 
 import numpy as np
-import matplotlib.pyplot as plt
 
-from rastrigin import func
-from rastrigin import LB, UB, funcName
-
-# from sphere import func
-# from sphere import LB, UB, funcName
-
-# from schaffer import func
-# from schaffer import LB, UB, funcName
-
-# from schwefel import func
-# from schwefel import LB, UB, funcName
+from checkpoint import Checkpointer, read_checkpoint
+from delta import DeltaEvaluator, Descent
+from energy import energy_scale, fight_remainder, fight_remainders, redistribute, reproduction_loss, to_units
+from evaluators import evaluators
+from fitness_cache import FitnessCache
+from pairing import fight_pairings, random_pairs
+from operators import crossover_operators, polynomial_mutation
+from population import Population
+from telemetry import ColumnarSink, StatisticsCollector
+from termination import Termination, termination_criteria
+
+import rastrigin
+import schaffer
+import schwefel
+import sphere
+
+benchmarks = {
+    "rastrigin": rastrigin,
+    "sphere": sphere,
+    "schaffer": schaffer,
+    "schwefel": schwefel
+}
 
 settings = {
     "startEnergy": 1000,
     "mutation_probability": 1,
+    "crossover": "two_point",
     "crossover_probability": 0.5,
     "distribution_index": 0.2,
     "fightLossEnergy": 0.05,
     "reproduceLossEnergy": 0.3,
     "reproduceReqEnergy": 1700,
     "deathThreshold": 8,
-    "crowdingFactor": 1000
+    "crowdingFactor": 1000,
+    # with the two_point crossover and at least deltaEvaluationMinDimensions
+    # dimensions, newborns of separable functions are evaluated from their
+    # parents' terms instead of by the evaluator
+    "deltaEvaluation": True,
+    "deltaEvaluationMinDimensions": 1000,
+    "deltaRefreshInterval": 1000,
+    # fight partners are random or neighbours in a random projection of the
+    # genotypes to neighbourDimensions dimensions
+    "fightPairing": "random",
+    "neighbourDimensions": 3,
+    # above maxNumberOfAgents the agents with the least energy (or the worst
+    # fitness) are evicted and their energy is shared by the others
+    "maxNumberOfAgents": None,
+    "evictionKey": "energy"
 }
 
-dimensions = 100
-numberOfAgents = 20
-maxNumberOfFitnessEvaluations = 1000
-
-numberOfFitnessEvaluations = 0
-numberOfBornAgents, numberOfDeadAgents = 0, 0
-
-emasIsRunning = False
-data = []
-
-
-def update_data():
-    global data, numberOfBornAgents, numberOfDeadAgents, emasIsRunning
-
-    if not emasIsRunning:
-        return
-
-    agents_num = len(emas.agents)
-    energy_sum = np.sum([agent.energy for agent in emas.agents])
-
-    vectors = np.array([agent.x for agent in emas.agents])
-    std = np.std(vectors, axis=0)
-    min_std = np.min(std)
-    max_std = np.max(std)
-
-    best_agent = min(emas.agents, key=lambda agent: agent.fitness)
-    if len(data) % 100 == 0:
-        print(f"Evaluation: {len(data)} fitness: {best_agent.fitness}")
-    data.append((
-        agents_num,
-        numberOfBornAgents,
-        numberOfDeadAgents,
-        best_agent.fitness,
-        np.mean([agent.fitness for agent in emas.agents]),
-        best_agent.energy,
-        np.mean([agent.energy for agent in emas.agents]),
-        min_std,
-        max_std,
-        energy_sum
-    ))
+# parameters of a run which are not EMAS settings
+run_settings = {
+    "function": "rastrigin",
+    "dimensions": 100,
+    "numberOfAgents": 20,
+    "maxNumberOfFitnessEvaluations": 1000,
+    # the run also stops after maxTime seconds, once the best fitness is at
+    # most targetFitness or after stagnationEvaluations evaluations without
+    # an improvement of more than stagnationTolerance, unless they are None
+    "maxTime": None,
+    "targetFitness": None,
+    "stagnationEvaluations": None,
+    "stagnationTolerance": 0.0,
+    # entropy of the run's SeedSequence, drawn from the OS when None
+    "seed": None,
+    # statistics are recorded every N evaluations and/or every N iterations
+    "statisticsEvaluationInterval": 10,
+    "statisticsIterationInterval": None,
+    # newborns are evaluated by a serial, numpy, thread or process evaluator
+    # unless delta evaluation applies
+    "evaluator": "numpy",
+    "evaluatorWorkers": None,
+    "evaluatorChunkSize": None,
+    # fitness of already evaluated genotypes is reused from a cache of at most
+    # fitnessCacheBytes, keyed by the genes rounded to fitnessCacheQuantum
+    # (exact when None), cache hits count against the budget only with
+    # fitnessCacheHitsCount, so the run also stops after
+    # fitnessCacheHitStreak cache hits in a row
+    "fitnessCacheBytes": None,
+    "fitnessCacheQuantum": None,
+    "fitnessCacheHitsCount": False,
+    "fitnessCacheHitStreak": 1000,
+    # defaults to results/<function>_<start time>_telemetry
+    "telemetryDirectory": None,
+    # the run is checkpointed to checkpointPath every checkpointInterval
+    # evaluations, resume it with main.py --resume <checkpointPath>
+    "checkpointPath": None,
+    "checkpointInterval": 10000,
+    "verbose": False
+}
 
 
 class Agent:
-    def __init__(self, x, energy=settings["startEnergy"]):
-        self.x = x
-        self.energy = energy
-        self.fitness = func(x)
-
-        global numberOfFitnessEvaluations
-        numberOfFitnessEvaluations += 1
-
-        update_data()
-
     @staticmethod
-    def crossover(parent1, parent2):
-        parents = [parent1, parent2]
-        offspring = copy.deepcopy(parents)
-        permutation_length = len(offspring[0].x)
-
-        cross_points = sorted(
-            [random.randint(0, permutation_length) for _ in range(2)])
-
-        def _repeated(element, collection):
-            c = 0
-            for e in collection:
-                if e == element:
-                    c += 1
-            return c > 1
-
-        def _swap(data_a, data_b, cross_points):
-            c1, c2 = cross_points
-            new_a = data_a[:c1] + data_b[c1:c2] + data_a[c2:]
-            new_b = data_b[:c1] + data_a[c1:c2] + data_b[c2:]
-            return new_a, new_b
-
-        def _map(swapped, cross_points):
-            n = len(swapped[0])
-            c1, c2 = cross_points
-            s1, s2 = swapped
-            map_ = s1[c1:c2], s2[c1:c2]
-            for i_chromosome in range(n):
-                if not c1 < i_chromosome < c2:
-                    for i_son in range(2):
-                        while _repeated(swapped[i_son][i_chromosome], swapped[i_son]):
-                            try:
-                                map_index = map_[i_son].index(
-                                    swapped[i_son][i_chromosome])
-                                swapped[i_son][i_chromosome] = map_[
-                                    1 - i_son][map_index]
-                            except ValueError as ve:
-                                print('ValueError encountered, Action skipped')
-                                break
-            return s1, s2
-
-        swapped = _swap(parents[0].x, parents[1].x, cross_points)
-        mapped = _map(swapped, cross_points)
-
-        offspring[0].x, offspring[1].x = mapped
-
-        return offspring[0].x, offspring[1].x
+    def crossover(x1, x2, settings, lowerBound, upperBound, rng):
+        return crossover_operators[settings["crossover"]](x1, x2, lowerBound, upperBound, rng=rng)
 
     @staticmethod
-    def mutate(x):
-        for i in range(len(x)):
-            rand = random.random()
-
-            if rand <= 1 / len(x):
-                y = x[i]
-                yl, yu = LB, UB
-
-                if yl == yu:
-                    y = yl
-                else:
-                    delta1 = (y - yl) / (yu - yl)
-                    delta2 = (yu - y) / (yu - yl)
-                    rnd = random.random()
-                    mut_pow = 1.0 / (settings["distribution_index"] + 1.0)
-                    if rnd <= 0.5:
-                        xy = 1.0 - delta1
-                        val = 2.0 * rnd + (1.0 - 2.0 * rnd) * (
-                            pow(xy, settings["distribution_index"] + 1.0))
-                        deltaq = pow(val, mut_pow) - 1.0
-                    else:
-                        xy = 1.0 - delta2
-                        val = 2.0 * (1.0 - rnd) + 2.0 * (rnd - 0.5) * (
-                            pow(xy, settings["distribution_index"] + 1.0))
-                        deltaq = 1.0 - pow(val, mut_pow)
-
-                    y += deltaq * (yu - yl)
-                    if y < LB:
-                        y = LB
-                    if y > UB:
-                        y = UB
-                x[i] = y
-        return x
+    def mutate(x, settings, lowerBound, upperBound, rng):
+        return polynomial_mutation(x, lowerBound, upperBound, settings["distribution_index"], rng=rng)
 
     @staticmethod
-    def reproduce(parent1, parent2, loss_energy, f_avg):
-        parent1_loss = math.ceil(parent1.energy * loss_energy)
-        parent1.energy -= parent1_loss
+    def reproduce(population, parents1, parents2, loss_energy, f_avg, settings, lowerBound, upperBound, rng):
+        energy = population.energy
+        scale = energy_scale(settings)
 
-        parent2_loss = math.ceil(parent2.energy * loss_energy)
-        parent2.energy -= parent2_loss
+        parents1_loss = reproduction_loss(energy[parents1], loss_energy, scale)
+        energy[parents1] -= parents1_loss
 
-        # Possible crossover
-        if random.random() < settings["crossover_probability"]:
-            newborn_x1, newborn_x2 = Agent.crossover(parent1, parent2)
-        else:
-            newborn_x1, newborn_x2 = Agent.crossover(parent2, parent1)
+        parents2_loss = reproduction_loss(energy[parents2], loss_energy, scale)
+        energy[parents2] -= parents2_loss
 
-        mutation_probability_x1 = mutation_probability_x2 = settings["mutation_probability"]
-
-        # if func(newborn_x1) < f_avg:
-        #     mutation_probability_x1 /= 2
-        # else:
-        #     mutation_probability_x1 *= 2
-
-        # if func(newborn_x2) < f_avg:
-        #     mutation_probability_x2 /= 2
-        # else:
-        #     mutation_probability_x2 *= 2
+        # Possible crossover
+        swapped = rng.random(len(parents1)) >= settings["crossover_probability"]
+        parents1, parents2 = (np.where(swapped, parents2, parents1),
+                              np.where(swapped, parents1, parents2))
+        # the first half of the newborns descends from parents1 and the
+        # second from parents2, the crossover recombines the halves in place
+        parents = np.concatenate([parents1, parents2])
+        newborns = population.x[parents]
+        segments = Agent.crossover(*np.split(newborns, 2), settings, lowerBound, upperBound, rng)
+        if segments is not None:
+            segments = np.concatenate([segments, segments])
+
+        descent = Descent(parents, np.roll(parents, len(parents) // 2), segments)
+        return newborns, descent, parents1_loss + parents2_loss
 
-        random_number = random.random()
-        if random_number < mutation_probability_x1:
-            newborn_x1 = Agent.mutate(newborn_x1)
-        if random_number < mutation_probability_x2:
-            newborn_x2 = Agent.mutate(newborn_x2)
+    @staticmethod
+    def fight(population, agent_1, agent_2, loss_energy, settings):
+        energy, fitness = population.energy, population.fitness
 
-        newborn1 = Agent(newborn_x1, parent1_loss + parent2_loss)
-        newborn2 = Agent(newborn_x2, parent1_loss + parent2_loss)
+        d = float(np.sum(np.abs(population.x[agent_1] - population.x[agent_2])))
+        if fitness[agent_1] < fitness[agent_2]:
+            winner, loser = agent_1, agent_2
+        else:
+            winner, loser = agent_2, agent_1
 
-        return newborn1 if newborn1.fitness < newborn2.fitness else newborn2
+        loser_energy = int(energy[loser])
+        transfer = loser_energy - fight_remainder(
+            loser_energy, loss_energy, d, settings["crowdingFactor"])
+        energy[winner] += transfer
+        energy[loser] -= transfer
 
     @staticmethod
-    def fight(agent_1, agent_2, loss_energy):
-        d = np.sum(np.abs(np.array(agent_1.x) - np.array(agent_2.x)))
-        if agent_1.fitness < agent_2.fitness:
-            energy = agent_2.energy * loss_energy
-            agent_1.energy += energy
-            agent_2.energy -= energy
-            if d < settings["crowdingFactor"]:
-                energy = agent_2.energy * \
-                    (1-d**2/settings["crowdingFactor"]**2)
-                agent_1.energy += energy
-                agent_2.energy -= energy
-        else:
-            energy = agent_1.energy * loss_energy
-            agent_1.energy -= energy
-            agent_2.energy += energy
-            if d < settings["crowdingFactor"]:
-                energy = agent_1.energy * \
-                    (1-d**2/settings["crowdingFactor"]**2)
-                agent_1.energy -= energy
-                agent_2.energy += energy
+    def fights(population, agents1, agents2, loss_energy, settings):
+        """``fight`` of every pair ``agents1[i]``, ``agents2[i]`` at once, no
+        agent may be in two pairs."""
+        energy, fitness = population.energy, population.fitness
 
-        agent_1.energy = np.true_divide(np.floor(
-            agent_1.energy * 10**settings["deathThreshold"]), 10**settings["deathThreshold"])
-        agent_2.energy = np.true_divide(np.floor(
-            agent_2.energy * 10**settings["deathThreshold"]), 10**settings["deathThreshold"])
+        d = np.sum(np.abs(population.x[agents1] - population.x[agents2]), axis=1)
+        won = fitness[agents1] < fitness[agents2]
+        winners = np.where(won, agents1, agents2)
+        losers = np.where(won, agents2, agents1)
 
-    def is_dead(self):
-        return self.energy <= 0
+        transfer = energy[losers] - fight_remainders(
+            energy[losers], loss_energy, d, settings["crowdingFactor"])
+        energy[winners] += transfer
+        energy[losers] -= transfer
 
 
 class EMAS:
-    def __init__(self, agents):
-        self.agents = agents
+    def __init__(self, config, telemetry_directory, seed_sequence=None):
+        self.config = config
+        # spawn children of seedSequence for independent streams of islands
+        # and workers
+        self.seedSequence = seed_sequence or np.random.SeedSequence(config["seed"])
+        self.rng = np.random.default_rng(self.seedSequence)
+        benchmark = benchmarks[config["function"]]
+        self.lowerBound = benchmark.LB
+        self.upperBound = benchmark.UB
+        self.energyScale = energy_scale(config)
+        self.evaluator = evaluators[config["evaluator"]](
+            benchmark.func_batch, config["evaluatorWorkers"], config["evaluatorChunkSize"])
+
+        # only two-point crossovers leave most genes of a newborn as they were
+        # in a parent, and below about a thousand genes a full evaluation is
+        # cheaper than copying the parent's terms
+        self.deltaEvaluator = None
+        if config["deltaEvaluation"] and config["crossover"] == "two_point" and benchmark.func_terms is not None \
+                and config["dimensions"] >= config["deltaEvaluationMinDimensions"]:
+            self.deltaEvaluator = DeltaEvaluator(
+                benchmark.func_terms, benchmark.func_offset, config["deltaRefreshInterval"])
+
+        self.fitnessCache = None
+        if config["fitnessCacheBytes"]:
+            self.fitnessCache = FitnessCache(config["fitnessCacheBytes"], config["fitnessCacheQuantum"])
+
+        if config["maxNumberOfAgents"] is not None and config["maxNumberOfAgents"] < 2:
+            raise ValueError("maxNumberOfAgents must be at least 2")
+        if config["evictionKey"] not in ("energy", "fitness"):
+            raise ValueError(f'Unknown eviction key: {config["evictionKey"]}')
+
+        self.population = None
+        # reproduce never starts more evaluations than are left
+        self.evaluationBudget = config["maxNumberOfFitnessEvaluations"]
+        self.numberOfFitnessEvaluations = 0
+        self.numberOfBornAgents, self.numberOfDeadAgents = 0, 0
+        self.emasIsRunning = False
+
+        self.data = ColumnarSink(telemetry_directory)
+        self.statistics = StatisticsCollector(
+            config["dimensions"], config["statisticsEvaluationInterval"],
+            config["statisticsIterationInterval"], sink=self.data)
+        self.nextReport = 0
+
+    def setPopulation(self, x):
+        projection = None
+        if self.config["fightPairing"] == "neighbours":
+            projection = self.rng.standard_normal((self.config["dimensions"], self.config["neighbourDimensions"]))
+
+        self.population = Population(x, to_units(self.config["startEnergy"], self.energyScale),
+                                     *self.evaluate(x), energy_scale=self.energyScale,
+                                     projection=projection)
+        self.emasIsRunning = True
+
+        self.statistics.reset(self.population)
+        self.statistics.record(self.population, self.numberOfFitnessEvaluations,
+                               self.numberOfBornAgents, self.numberOfDeadAgents)
+
+    def update_data(self):
+        if not self.emasIsRunning:
+            return
+
+        row = self.statistics.after_evaluations(
+            self.population, self.numberOfFitnessEvaluations,
+            self.numberOfBornAgents, self.numberOfDeadAgents)
+        if row is not None and self.config["verbose"] and self.numberOfFitnessEvaluations >= self.nextReport:
+            print(f"Evaluation: {self.numberOfFitnessEvaluations} fitness: {row[4]}")
+            self.nextReport = self.numberOfFitnessEvaluations - self.numberOfFitnessEvaluations % 100 + 100
+
+    def count_evaluations(self, count):
+        self.numberOfFitnessEvaluations += count
+        self.update_data()
+
+    def evaluate(self, x):
+        fitness, terms, evaluations = self.submit(x)()
+        self.count_evaluations(evaluations)
+
+        return fitness, terms
+
+    def submit(self, x, descent=None):
+        """Start evaluating ``x``, newborns of ``descent`` if given, and
+        return a function waiting for their fitness, terms and the number of
+        evaluations to count."""
+        if self.fitnessCache is None:
+            wait = self.submit_uncached(x, descent)
+            return lambda: (*wait(), len(x))
+
+        def submit_misses(evaluate):
+            return self.submit_uncached(x[evaluate], None if descent is None else descent.subset(evaluate))
+        return self.fitnessCache.submit(x, submit_misses, self.config["fitnessCacheHitsCount"])
+
+    def submit_uncached(self, x, descent=None):
+        if self.deltaEvaluator is None:
+            future = self.evaluator.submit(x)
+            return lambda: (future.result(), None)
+
+        if descent is None:
+            fitness, terms = self.deltaEvaluator.evaluate(x)
+        else:
+            fitness, terms = self.deltaEvaluator.evaluate_newborns(self.population, x, descent)
+        return lambda: (fitness, terms)
+
+    def close(self):
+        self.evaluator.close()
+        self.data.close()
+
+    def state(self):
+        """Copy of everything but the configuration the run needs to
+        continue."""
+        population = self.population
+        state = {
+            "rng": self.rng.bit_generator.state,
+            "population": {
+                "x": population.x.copy(),
+                "energy": population.energy.copy(),
+                "fitness": population.fitness.copy(),
+                "terms": None if population.terms is None else population.terms.copy(),
+                "projection": population.projection,
+                "points": None if population.points is None else population.points.copy()
+            },
+            "numberOfFitnessEvaluations": self.numberOfFitnessEvaluations,
+            "numberOfBornAgents": self.numberOfBornAgents,
+            "numberOfDeadAgents": self.numberOfDeadAgents,
+            "nextReport": self.nextReport,
+            "statistics": self.statistics.state(),
+            "telemetry": self.data.state()
+        }
+        if self.deltaEvaluator is not None:
+            state["evaluationsSinceRefresh"] = self.deltaEvaluator.evaluations_since_refresh
+        if self.fitnessCache is not None:
+            state["fitnessCache"] = self.fitnessCache.state()
+        return state
+
+    def restore(self, state):
+        population = state["population"]
+        self.population = Population(population["x"], population["energy"], population["fitness"],
+                                     population["terms"], energy_scale=self.energyScale,
+                                     projection=population["projection"])
+        if population["points"] is not None:
+            self.population.points[:] = population["points"]
+        self.emasIsRunning = True
+
+        self.rng.bit_generator.state = state["rng"]
+        self.numberOfFitnessEvaluations = state["numberOfFitnessEvaluations"]
+        self.numberOfBornAgents = state["numberOfBornAgents"]
+        self.numberOfDeadAgents = state["numberOfDeadAgents"]
+        self.nextReport = state["nextReport"]
+        self.statistics.restore(state["statistics"])
+        self.data.restore(state["telemetry"])
+        if self.deltaEvaluator is not None:
+            self.deltaEvaluator.evaluations_since_refresh = state["evaluationsSinceRefresh"]
+        if self.fitnessCache is not None:
+            self.fitnessCache.restore(state["fitnessCache"])
 
     def run_iteration(self):
-        global numberOfBornAgents, numberOfDeadAgents
-
-        # shuffle
-        random.shuffle(self.agents)
-
-        # reproduce
-        children = self.reproduce()
-        numberOfBornAgents += len(children)
+        # reproduce, the newborns are evaluated while the agents fight
+        newborns, descent, energy, fitness = self.reproduce()
 
         # fight
         self.fight()
 
-        # update agents' array
-        self.agents.extend(children)
+        children_x, children_energy, children_fitness, children_terms = \
+            self.select_newborns(newborns, descent, energy, fitness)
+        self.numberOfBornAgents += len(children_energy)
+
+        # update agents' arrays
+        self.statistics.born(children_x)
+        self.population.extend(
+            children_x, children_energy, children_fitness, children_terms)
 
         # remove dead
         dead = self.clear()
-        numberOfDeadAgents += len(dead)
+        self.numberOfDeadAgents += dead + self.evict()
+
+        if self.deltaEvaluator is not None:
+            self.deltaEvaluator.refresh(self.population)
+
+        self.statistics.after_iteration(
+            self.population, self.numberOfFitnessEvaluations,
+            self.numberOfBornAgents, self.numberOfDeadAgents)
 
     def reproduce(self):
-        req_energy = settings["reproduceReqEnergy"]
-        loss_energy = settings["reproduceLossEnergy"]
-
-        parents = []
-        children = []
-        for idx, parent1 in enumerate(self.agents):
-            if parent1.energy > req_energy and parent1 not in parents:
-                available_parents = [agent for agent in self.agents if
-                                     agent != parent1 and agent.energy > req_energy and agent not in parents]
-                if available_parents:
-                    parent2 = random.choice(available_parents)
-                    children.append(Agent.reproduce(parent1, parent2, loss_energy,
-                                                    np.average([agent.fitness for agent in self.agents])))
-                    parents.extend([parent1, parent2])
-
-        return children
+        req_energy = to_units(self.config["reproduceReqEnergy"], self.energyScale)
+
+        parents1, parents2 = random_pairs(
+            np.flatnonzero(self.population.energy > req_energy), self.rng)
+        remaining = max(self.evaluationBudget - self.numberOfFitnessEvaluations, 0)
+        pairs = min(len(parents1), -(-remaining // 2))
+        newborns, descent, energy = self.breed(parents1[:pairs], parents2[:pairs])
+
+        # both newborns of every pair are evaluated in one batch, but for the
+        # second newborn of the last pair when a single evaluation is left
+        evaluated = min(len(newborns), remaining)
+        evaluated_descent = descent if evaluated == len(newborns) else descent.subset(np.arange(evaluated))
+        return newborns, descent, energy, self.submit(newborns[:evaluated], evaluated_descent)
+
+    def breed(self, parents1, parents2):
+        """Two newborns of every pair of parents, the first halves descending
+        from ``parents1``, and their ``Descent``. The parents' energy is set
+        aside until the newborns are evaluated."""
+        loss_energy = self.config["reproduceLossEnergy"]
+        f_avg = np.average(self.population.fitness)
+
+        newborns, descent, energy = Agent.reproduce(
+            self.population, parents1, parents2, loss_energy, f_avg,
+            self.config, self.lowerBound, self.upperBound, self.rng)
+
+        # one random number per pair decides whether both newborns mutate
+        mutated = np.tile(self.rng.random(len(parents1))
+                          < self.config["mutation_probability"], 2)
+        if mutated.all():
+            genes = Agent.mutate(newborns, self.config, self.lowerBound, self.upperBound, self.rng)
+            descent.mutated, descent.mutated_genes = np.divmod(genes, newborns.shape[1])
+        elif mutated.any():
+            rows = np.flatnonzero(mutated)
+            mutated_newborns = newborns[rows]
+            genes = Agent.mutate(mutated_newborns, self.config, self.lowerBound, self.upperBound, self.rng)
+            newborns[rows] = mutated_newborns
+            mutated_rows, descent.mutated_genes = np.divmod(genes, newborns.shape[1])
+            descent.mutated = rows[mutated_rows]
+
+        return newborns, descent, energy
+
+    def select_newborns(self, newborns, descent, energy, fitness):
+        fitness, terms, evaluations = fitness()
+        self.count_evaluations(evaluations)
+
+        # newborns left unevaluated are never chosen
+        missing = len(newborns) - len(fitness)
+        if missing:
+            fitness = np.concatenate([fitness, np.full(missing, np.inf)])
+            if terms is not None:
+                terms = np.concatenate([terms, np.zeros((missing, terms.shape[1]))])
+
+        fitness1, fitness2 = np.split(fitness, 2)
+        newborns_x1, newborns_x2 = np.split(newborns, 2)
+
+        better = fitness1 < fitness2
+        if terms is not None:
+            terms1, terms2 = np.split(terms, 2)
+            terms = np.where(better[:, np.newaxis], terms1, terms2)
+
+        return (np.where(better[:, np.newaxis], newborns_x1, newborns_x2),
+                energy, np.where(better, fitness1, fitness2), terms)
 
     def fight(self):
-        loss_energy = settings["fightLossEnergy"]
-
-        fighters = []
-        for idx, agent1 in enumerate(self.agents):
-            if agent1 not in fighters:
-                available_fighters = [agent for agent in self.agents if
-                                      agent != agent1 and agent not in fighters]
-                if available_fighters:
-                    agent2 = random.choice(available_fighters)
-                    Agent.fight(agent1, agent2, loss_energy)
-                    fighters.extend([agent1, agent2])
+        loss_energy = self.config["fightLossEnergy"]
+
+        pairs = fight_pairings[self.config["fightPairing"]](self.population, self.rng)
+        Agent.fights(self.population, *pairs, loss_energy, self.config)
 
     def clear(self):
-        dead = [agent for agent in self.agents if agent.is_dead()]
-        self.agents = [agent for agent in self.agents if not agent.is_dead()]
-        return dead
-
-
-def save_to_file(file_name, output, start_time, end_time):
-    settings['function'] = funcName
-    settings['agents'] = numberOfAgents
-    settings['dimensions'] = dimensions
-    settings['output'] = output
-    settings['time'] = end_time - start_time
-    try:
-        with open(file_name, 'a+') as file:
-            json.dump(settings, file, indent=4)
-            file.write('\n')
-    except Exception as e:
-        print("Error while saving results to file:", e)
-
-
-'''
-==============
-main()
-==============
-'''
-
-start_time = time.time()
-
-emas = EMAS([Agent([random.uniform(LB, UB) for _ in range(dimensions)])
-            for _ in range(numberOfAgents)])
-emasIsRunning = True
-
-update_data()
-
-while numberOfFitnessEvaluations < maxNumberOfFitnessEvaluations:
-    emas.run_iteration()
-
-end_time = time.time()
-
-print("Number of agents left:", len(emas.agents))
-print()
-print("Total number of fitness evaluations:", numberOfFitnessEvaluations)
-print()
-print("Total number of born agents:", numberOfBornAgents)
-print("Total number of dead agents:", numberOfDeadAgents)
-print()
-
-best_agent = min(emas.agents, key=lambda agent: agent.fitness)
-
-for i in range(len(best_agent.x)):
-    best_agent.x[i] = round(best_agent.x[i], 2)
-
-output = f"Minimum in {best_agent.x} equals = {best_agent.fitness:.2f} for agent with energy equals = {best_agent.energy:.2f}"
-print(output)
-
-agents_num, born_agents, dead_agents = [], [], []
-best_fitness, avg_fitness = [], []
-best_energy, avg_energy = [], []
-std_min, std_max = [], []
-energy_sum = []
-
-for i, snapshot in enumerate(data):
-    agents_num.append(snapshot[0])
-    born_agents.append(snapshot[1])
-    dead_agents.append(snapshot[2])
-    best_fitness.append(snapshot[3])
-    avg_fitness.append(snapshot[4])
-    best_energy.append(snapshot[5])
-    avg_energy.append(snapshot[6])
-    std_min.append(snapshot[7])
-    std_max.append(snapshot[8])
-    energy_sum.append(snapshot[9])
-
-fig, axes = plt.subplots(nrows=3, ncols=2, figsize=(15, 12))
-fig.tight_layout(pad=5.0)
-
-axes[0, 0].plot(best_fitness, label='Best Fitness')
-axes[0, 0].plot(avg_fitness, label='Average Fitness')
-axes[0, 0].legend()
-axes[0, 0].set_title('Fitness over Time')
-axes[0, 0].set_xlabel('Fitness evaluations')
-axes[0, 0].set_ylabel('Fitness')
-
-axes[0, 1].plot(best_energy, label='Best Energy')
-axes[0, 1].plot(avg_energy, label='Average Energy')
-axes[0, 1].legend()
-axes[0, 1].set_title('Energy over Time')
-axes[0, 1].set_xlabel('Fitness evaluations')
-axes[0, 1].set_ylabel('Energy')
-
-axes[1, 0].plot(agents_num, label='Number of Agents')
-axes[1, 0].legend()
-axes[1, 0].set_title('Agents over Time')
-axes[1, 0].set_xlabel('Fitness evaluations')
-axes[1, 0].set_ylabel('Number of Agents')
-
-axes[1, 1].plot(std_min, label='Minimum Std Dev')
-axes[1, 1].plot(std_max, label='Maximum Std Dev')
-axes[1, 1].legend()
-axes[1, 1].set_title('Diversity over Time')
-axes[1, 1].set_xlabel('Fitness evaluations')
-axes[1, 1].set_ylabel('Standard Deviation')
-
-axes[2, 0].plot(born_agents, label='Born Agents')
-axes[2, 0].plot(dead_agents, label='Dead Agents')
-axes[2, 0].legend()
-axes[2, 0].set_title('Total Born and Dead Agents over Time')
-axes[2, 0].set_xlabel('Fitness evaluations')
-axes[2, 0].set_ylabel('Number of Agents')
-
-axes[2, 1].plot(energy_sum, label='Total Energy')
-axes[2, 1].legend()
-axes[2, 1].set_title('Total Energy over Time')
-axes[2, 1].set_xlabel('Fitness evaluations')
-axes[2, 1].set_ylabel('Energy')
-
-# plt.show()
-file_name = "results/"+funcName+"_"+str(time.time())
-plt.savefig(file_name+".png")
-save_to_file(file_name+".txt", output, start_time, end_time)
+        dead = self.population.energy <= 0
+        self.statistics.died(self.population.x[dead])
+        return self.population.compact(~dead)
+
+    def evict(self):
+        """Keep at most ``maxNumberOfAgents`` agents and return the number of
+        evicted ones. The evicted energy is shared by the survivors, so the
+        total energy is unchanged."""
+        excess = len(self.population) - (self.config["maxNumberOfAgents"] or len(self.population))
+        if excess <= 0:
+            return 0
+
+        if self.config["evictionKey"] == "energy":
+            key = self.population.energy
+        else:
+            key = -self.population.fitness
+        # selecting the excess costs O(N), like the iteration's fights
+        evicted = np.zeros(len(self.population), dtype=bool)
+        evicted[np.argpartition(key, excess - 1)[:excess]] = True
+
+        units = np.sum(self.population.energy[evicted])
+        self.statistics.died(self.population.x[evicted])
+        self.population.compact(~evicted)
+        redistribute(self.population.energy, units)
+        return excess
+
+    def emigrate(self, agents):
+        """Remove ``agents`` and return their genotypes, energy, fitness and
+        terms, the energy leaves the population with them."""
+        leaving = np.zeros(len(self.population), dtype=bool)
+        leaving[agents] = True
+        terms = None if self.population.terms is None else self.population.terms[leaving]
+        migrants = (self.population.x[leaving], self.population.energy[leaving],
+                    self.population.fitness[leaving], terms)
+
+        self.statistics.died(migrants[0])
+        self.population.compact(~leaving)
+        return migrants
+
+    def immigrate(self, x, energy, fitness, terms):
+        self.statistics.born(x)
+        self.population.extend(x, energy, fitness, terms)
+        self.numberOfDeadAgents += self.evict()
+
+
+class Result:
+    def __init__(self, config, function_name, emas, telemetry_directory, time):
+        self.config = config
+        self.function_name = function_name
+        self.telemetry_directory = telemetry_directory
+        self.time = time
+
+        self.agents = len(emas.population)
+        self.evaluations = emas.numberOfFitnessEvaluations
+        self.born_agents = emas.numberOfBornAgents
+        self.dead_agents = emas.numberOfDeadAgents
+        self.evaluations_per_second = self.evaluations / time if time > 0 else 0.0
+        self.termination_reason = None
+        cache = emas.fitnessCache
+        self.cache_hits, self.cache_misses = (0, 0) if cache is None else (cache.hits, cache.misses)
+
+        best_agent = emas.population.best()
+        self.best_x = emas.population.x[best_agent].copy()
+        self.best_fitness = emas.population.fitness[best_agent]
+        self.best_energy = emas.population.energy[best_agent] / emas.energyScale
+
+
+def random_population(config, lowerBound, upperBound, rng):
+    return rng.uniform(lowerBound, upperBound, (config["numberOfAgents"], config["dimensions"]))
+
+
+def run_emas(config=None):
+    """Run EMAS once and return its ``Result``.
+
+    :param config: Overrides of ``settings`` and ``run_settings``.
+    """
+    config = {**settings, **run_settings, **(config or {})}
+    function_name = benchmarks[config["function"]].funcName
+
+    start_time = time.time()
+    telemetry_directory = config["telemetryDirectory"]
+    if telemetry_directory is None:
+        telemetry_directory = "results/"+function_name+"_"+str(start_time)+"_telemetry"
+
+    emas = EMAS(config, telemetry_directory)
+    emas.setPopulation(random_population(config, emas.lowerBound, emas.upperBound, emas.rng))
+
+    return continue_emas(emas, time.time() - start_time)
+
+
+def resume_emas(checkpoint_path):
+    """Continue the run checkpointed to ``checkpoint_path`` exactly as it
+    would have gone on and return its ``Result``."""
+    checkpoint = read_checkpoint(checkpoint_path)
+
+    emas = EMAS(checkpoint["config"], checkpoint["telemetryDirectory"])
+    emas.restore(checkpoint["emas"])
+
+    return continue_emas(emas, checkpoint["time"], checkpoint.get("termination", {}))
+
+
+def continue_emas(emas, elapsed_time, termination_state=None):
+    """Run ``emas`` until one of its termination criteria is reached and
+    return its ``Result``."""
+    config = emas.config
+    termination = Termination(termination_criteria(
+        config, to_units(config["reproduceReqEnergy"], emas.energyScale)), elapsed_time)
+    if termination_state:
+        termination.restore(termination_state)
+
+    checkpointer = None
+    if config["checkpointPath"] is not None:
+        checkpointer = Checkpointer(config["checkpointPath"], config["checkpointInterval"],
+                                    emas.numberOfFitnessEvaluations)
+
+    while not termination.done(emas):
+        emas.run_iteration()
+
+        if checkpointer is not None and checkpointer.due(emas.numberOfFitnessEvaluations):
+            checkpointer.save({"config": config, "telemetryDirectory": emas.data.directory,
+                               "time": termination.elapsed_time(), "termination": termination.state(),
+                               "emas": emas.state()},
+                              emas.numberOfFitnessEvaluations)
+
+    if checkpointer is not None:
+        checkpointer.wait()
+    emas.close()
+
+    result = Result(config, benchmarks[config["function"]].funcName, emas, emas.data.directory,
+                    termination.elapsed_time())
+    result.termination_reason = termination.reason
+    return result
+
+
+if __name__ == "__main__":
+    from report import plot_telemetry, save_to_file
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="continue a checkpointed run")
+    args = parser.parse_args()
+
+    if args.resume is None:
+        file_name = "results/"+benchmarks[run_settings["function"]].funcName+"_"+str(time.time())
+        result = run_emas({"telemetryDirectory": file_name+"_telemetry", "verbose": True,
+                           "checkpointPath": file_name+".checkpoint.npz"})
+    else:
+        result = resume_emas(args.resume)
+        file_name = result.telemetry_directory.removesuffix("_telemetry")
+
+    print("Number of agents left:", result.agents)
+    print()
+    print("Total number of fitness evaluations:", result.evaluations)
+    print(f"Evaluations per second: {result.evaluations_per_second:.1f}")
+    print("Stopped by:", result.termination_reason)
+    print()
+    print("Total number of born agents:", result.born_agents)
+    print("Total number of dead agents:", result.dead_agents)
+    print()
+    if result.config["fitnessCacheBytes"]:
+        print("Fitness cache hits:", result.cache_hits, "misses:", result.cache_misses)
+        print()
+
+    best_x = np.round(result.best_x, 2).tolist()
+
+    output = f"Minimum in {best_x} equals = {result.best_fitness:.2f} for agent with energy equals = {result.best_energy:.2f}"
+    print(output)
+
+    plot_telemetry(result.telemetry_directory, file_name+".png")
+    save_to_file(file_name+".txt", result, output)
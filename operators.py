@@ -0,0 +1,161 @@
+import numpy as np
+
+SPARSE_MUTATION_PROBABILITY = 0.1
+
+
+def _dense_selection(size, probability, rng):
+    return np.flatnonzero(rng.random(size) <= probability)
+
+
+def _sparse_selection(size, probability, rng):
+    # The gaps between selected genes of a Bernoulli(p) sequence are
+    # Geometric(p), so only O(size * p) random numbers are drawn.
+    selected = []
+    last = -1
+    while True:
+        expected = int((size - last) * probability * 1.25) + 16
+        positions = last + np.cumsum(rng.geometric(probability, expected))
+        selected.append(positions[positions < size])
+        if positions[-1] >= size:
+            break
+        last = positions[-1]
+
+    return np.concatenate(selected)
+
+
+def polynomial_mutation(x, lowerBound, upperBound, distribution_index, probability=None, sparse=None,
+                        rng=None):
+    """Polynomial mutation of a batch of genotypes, applied in place, and
+    the indices of the mutated genes in ``x.reshape(-1)``.
+
+    :param x: Genotype of shape (D,) or batch of genotypes of shape (N, D).
+    :param probability: Per-gene mutation probability, 1/D by default.
+    :param sparse: Draw the selected genes from geometric gaps instead of
+        one uniform number per gene. Chosen from ``probability`` if None.
+    :param rng: ``numpy.random.Generator`` of the run, a fresh one if None.
+    """
+    rng = np.random.default_rng(rng)
+    if not x.flags.c_contiguous:
+        raise ValueError("polynomial_mutation needs a C-contiguous array")
+    genes = x.reshape(-1)
+    none = np.empty(0, dtype=np.intp)
+
+    if probability is None:
+        probability = 1 / x.shape[-1]
+    if sparse is None:
+        sparse = probability <= SPARSE_MUTATION_PROBABILITY
+
+    if probability <= 0 or genes.size == 0:
+        return none
+    if sparse and probability < 1:
+        selected = _sparse_selection(genes.size, probability, rng)
+    else:
+        selected = _dense_selection(genes.size, probability, rng)
+    if selected.size == 0:
+        return none
+
+    yl, yu = lowerBound, upperBound
+    if yl == yu:
+        genes[selected] = yl
+        return selected
+
+    y = genes[selected]
+    delta1 = (y - yl) / (yu - yl)
+    delta2 = (yu - y) / (yu - yl)
+    rnd = rng.random(selected.size)
+    mut_pow = 1.0 / (distribution_index + 1.0)
+
+    lower = rnd <= 0.5
+    xy = np.where(lower, 1.0 - delta1, 1.0 - delta2)
+    val = np.where(lower,
+                   2.0 * rnd + (1.0 - 2.0 * rnd) * xy ** (distribution_index + 1.0),
+                   2.0 * (1.0 - rnd) + 2.0 * (rnd - 0.5) * xy ** (distribution_index + 1.0))
+    deltaq = np.where(lower, val ** mut_pow - 1.0, 1.0 - val ** mut_pow)
+
+    genes[selected] = np.clip(y + deltaq * (yu - yl), yl, yu)
+    return selected
+
+
+def _rows(x):
+    return x.reshape(-1, x.shape[-1])
+
+
+def two_point_crossover(x1, x2, lowerBound=None, upperBound=None, rng=None):
+    """Swap a random segment between every pair of rows of ``x1`` and
+    ``x2``, in place, and return the ``(start, stop)`` of every segment.
+    The other crossovers return None, they change genes everywhere."""
+    rng = np.random.default_rng(rng)
+    x1, x2 = _rows(x1), _rows(x2)
+    count, dimensions = x1.shape
+
+    cross_points = np.sort(rng.integers(0, dimensions + 1, (count, 2)), axis=1)
+    genes = np.arange(dimensions)
+    segment = (genes >= cross_points[:, :1]) & (genes < cross_points[:, 1:])
+
+    swapped = x1[segment]
+    x1[segment] = x2[segment]
+    x2[segment] = swapped
+    return cross_points
+
+
+def sbx_crossover(x1, x2, lowerBound, upperBound, distribution_index=20.0, gene_probability=0.5, rng=None):
+    """Simulated binary crossover of every pair of rows, in place."""
+    rng = np.random.default_rng(rng)
+    x1, x2 = _rows(x1), _rows(x2)
+
+    selected = (rng.random(x1.shape) <= gene_probability) & (np.abs(x1 - x2) > 1.0e-14)
+    if not selected.any():
+        return
+
+    y1 = np.minimum(x1[selected], x2[selected])
+    y2 = np.maximum(x1[selected], x2[selected])
+    yl, yu = lowerBound, upperBound
+    rnd = rng.random(y1.size)
+    exponent = 1.0 / (distribution_index + 1.0)
+
+    def betaq(beta):
+        alpha = 2.0 - beta ** -(distribution_index + 1.0)
+        return np.where(rnd <= 1.0 / alpha,
+                        (rnd * alpha) ** exponent,
+                        (1.0 / (2.0 - rnd * alpha)) ** exponent)
+
+    c1 = 0.5 * (y1 + y2 - betaq(1.0 + 2.0 * (y1 - yl) / (y2 - y1)) * (y2 - y1))
+    c2 = 0.5 * (y1 + y2 + betaq(1.0 + 2.0 * (yu - y2) / (y2 - y1)) * (y2 - y1))
+    c1, c2 = np.clip(c1, yl, yu), np.clip(c2, yl, yu)
+
+    flip = rng.random(y1.size) <= 0.5
+    x1[selected] = np.where(flip, c2, c1)
+    x2[selected] = np.where(flip, c1, c2)
+
+
+def blx_alpha_crossover(x1, x2, lowerBound, upperBound, alpha=0.5, rng=None):
+    """BLX-alpha crossover of every pair of rows, in place."""
+    rng = np.random.default_rng(rng)
+    x1, x2 = _rows(x1), _rows(x2)
+
+    low, high = np.minimum(x1, x2), np.maximum(x1, x2)
+    spread = alpha * (high - low)
+    low, high = low - spread, high + spread
+
+    x1[:] = np.clip(low + rng.random(x1.shape) * (high - low), lowerBound, upperBound)
+    x2[:] = np.clip(low + rng.random(x2.shape) * (high - low), lowerBound, upperBound)
+
+
+def arithmetic_crossover(x1, x2, lowerBound=None, upperBound=None, rng=None):
+    """Whole arithmetic crossover with one random weight per pair of rows,
+    in place."""
+    rng = np.random.default_rng(rng)
+    x1, x2 = _rows(x1), _rows(x2)
+
+    weight = rng.random((len(x1), 1))
+    c1 = weight * x1 + (1.0 - weight) * x2
+    x2[:] = (1.0 - weight) * x1 + weight * x2
+    x1[:] = c1
+
+
+crossover_operators = {
+    "two_point": two_point_crossover,
+    "sbx": sbx_crossover,
+    "blx_alpha": blx_alpha_crossover,
+    "arithmetic": arithmetic_crossover
+}
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+def random_pairs(candidates, rng=None):
+    """Random disjoint matching of the agent indices in ``candidates``.
+
+    A single permutation is split into consecutive pairs, so every candidate
+    is used at most once and the whole matching costs O(N). With an odd
+    number of candidates the last one in the permutation stays unpaired.
+    Returns two index arrays of equal length.
+
+    :param rng: ``numpy.random.Generator`` of the run, a fresh one if None.
+    """
+    candidates = np.random.default_rng(rng).permutation(candidates)
+    pairs = len(candidates) // 2
+    return candidates[0:2 * pairs:2], candidates[1:2 * pairs:2]
+
+
+def neighbour_pairs(points, rng=None):
+    """Disjoint matching of the agents pairing up neighbours in the
+    ``(N, k)`` array of their projected genotypes.
+
+    Agents are sorted along a Z-order curve over a grid laid on the points
+    and consecutive agents are paired, which costs O(N log N). The grid is
+    shifted randomly on every call so that agents near a cell boundary
+    meet different neighbours over time. Returns two index arrays of equal
+    length."""
+    rng = np.random.default_rng(rng)
+    count, k = points.shape
+    if count < 2:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    bits = min(63 // k, 30)
+    low, high = points.min(axis=0), points.max(axis=0)
+    span = np.maximum(high - low, np.finfo(float).tiny)
+    # the grid covers 1.5 times the points' range, shifted by up to half of it
+    shift = rng.random(k) * span / 2
+    cells = ((points - low + shift) / (1.5 * span) * (2**bits - 1)).astype(np.int64)
+
+    order = np.zeros(count, dtype=np.int64)
+    for bit in range(bits - 1, -1, -1):
+        for axis in range(k):
+            order = (order << 1) | ((cells[:, axis] >> bit) & 1)
+    agents = np.argsort(order, kind="stable")
+
+    # with an odd number of agents either end may stay unpaired
+    start = rng.integers(2) if count % 2 else 0
+    pairs = count // 2
+    return agents[start:start + 2 * pairs:2], agents[start + 1:start + 2 * pairs:2]
+
+
+def random_fights(population, rng):
+    return random_pairs(len(population), rng)
+
+
+def neighbour_fights(population, rng):
+    return neighbour_pairs(population.points, rng)
+
+
+fight_pairings = {
+    "random": random_fights,
+    "neighbours": neighbour_fights
+}
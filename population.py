@@ -0,0 +1,126 @@
+import numpy as np
+
+
+class Population:
+    """Structure-of-arrays storage for EMAS agents.
+
+    Agent ``i`` is row ``i`` of the ``(N, D)`` genotype matrix together with
+    ``energy[i]`` and ``fitness[i]``. Births append rows into spare capacity
+    and deaths compact the surviving rows to the front, so no per-agent
+    objects are ever created.
+
+    With ``terms`` given, the population also keeps every agent's
+    per-coordinate fitness contributions for delta evaluation.
+
+    Energy is stored as int64 units, ``energy_scale`` of them per unit of
+    energy (see ``energy.py``).
+
+    With a ``(D, k)`` ``projection`` matrix, the population also keeps every
+    agent's genotype projected to ``k`` dimensions in ``points``, computed
+    once per birth, for neighbourhood-aware pairing."""
+
+    def __init__(self, x, energy, fitness, terms=None, energy_scale=1, projection=None):
+        x = np.array(x, dtype=float, ndmin=2)
+        size, dimensions = x.shape
+
+        self.size = 0
+        self.dimensions = dimensions
+        self.energy_scale = energy_scale
+        self._x = np.empty((max(size, 1), dimensions))
+        self._energy = np.empty(max(size, 1), dtype=np.int64)
+        self._fitness = np.empty(max(size, 1))
+        self._terms = None if terms is None else np.empty((max(size, 1), dimensions))
+        self.projection = projection
+        self._points = None if projection is None else np.empty((max(size, 1), projection.shape[1]))
+
+        self.extend(x, energy, fitness, terms)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def x(self):
+        return self._x[:self.size]
+
+    @property
+    def energy(self):
+        return self._energy[:self.size]
+
+    @property
+    def fitness(self):
+        return self._fitness[:self.size]
+
+    @property
+    def terms(self):
+        return None if self._terms is None else self._terms[:self.size]
+
+    @property
+    def points(self):
+        return None if self._points is None else self._points[:self.size]
+
+    @property
+    def capacity(self):
+        return len(self._energy)
+
+    def _column_names(self):
+        names = ["_x", "_energy", "_fitness"]
+        if self._terms is not None:
+            names.append("_terms")
+        if self._points is not None:
+            names.append("_points")
+        return names
+
+    def _columns(self):
+        return [getattr(self, name) for name in self._column_names()]
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+
+        capacity = max(capacity, 2 * self.capacity)
+        for name in self._column_names():
+            column = getattr(self, name)
+            new_column = np.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            setattr(self, name, new_column)
+
+    def extend(self, x, energy, fitness, terms=None):
+        x = np.asarray(x, dtype=float).reshape(-1, self.dimensions)
+        count = len(x)
+        if count == 0:
+            return
+
+        self.reserve(self.size + count)
+
+        start, stop = self.size, self.size + count
+        self._x[start:stop] = x
+        self._energy[start:stop] = energy
+        self._fitness[start:stop] = fitness
+        if self._terms is not None:
+            self._terms[start:stop] = terms
+        if self._points is not None:
+            self._points[start:stop] = x @ self.projection
+        self.size = stop
+
+    def compact(self, keep):
+        """Move the rows selected by the boolean mask ``keep`` to the front,
+        preserving their order, and return the number of removed rows."""
+        keep = np.asarray(keep, dtype=bool)
+        survivors = np.flatnonzero(keep)
+        removed = self.size - len(survivors)
+        if removed == 0:
+            return 0
+
+        # Rows before the first removed one are already in place.
+        first = int(np.argmin(keep))
+        moved = survivors[survivors > first]
+        stop = first + len(moved)
+
+        for column in self._columns():
+            column[first:stop] = column[moved]
+        self.size = stop
+
+        return removed
+
+    def best(self):
+        return int(np.argmin(self.fitness))
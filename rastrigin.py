@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
 
 LB = -5.12
 UB = 5.12
@@ -8,8 +6,20 @@ funcName = "Rastrigin"
 
 
 def func(x, a=10):
-    dim = len(x)
-    return a * dim + np.sum([(xi ** 2 - a * np.cos(2 * np.pi * xi)) for xi in x])
+    return func_batch(np.asarray(x, dtype=float)[np.newaxis], a)[0]
+
+
+def func_batch(x, a=10):
+    x = np.asarray(x, dtype=float)
+    return func_offset(x.shape[1], a) + np.sum(func_terms(x, a), axis=1)
+
+
+def func_terms(x, a=10):
+    return x ** 2 - a * np.cos(2 * np.pi * x)
+
+
+def func_offset(dimensions, a=10):
+    return a * dimensions
 
 
 def generate_points(min_val, max_val, num_points):
@@ -17,6 +27,9 @@ def generate_points(min_val, max_val, num_points):
 
 
 if __name__ == "__main__":
+    import matplotlib
+    import matplotlib.pyplot as plt
+
     dimension, amount_of_points = 2, 100
     X = generate_points(-5.12, 5.12, amount_of_points)
     Y = generate_points(-5.12, 5.12, amount_of_points)
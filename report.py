@@ -0,0 +1,73 @@
+import json
+
+import matplotlib.pyplot as plt
+
+from telemetry import load_telemetry
+
+
+def plot_telemetry(telemetry_directory, file_name):
+    telemetry = load_telemetry(telemetry_directory)
+    evaluations = telemetry["evaluations"]
+
+    fig, axes = plt.subplots(nrows=3, ncols=2, figsize=(15, 12))
+    fig.tight_layout(pad=5.0)
+
+    axes[0, 0].plot(evaluations, telemetry["best_fitness"], label='Best Fitness')
+    axes[0, 0].plot(evaluations, telemetry["avg_fitness"], label='Average Fitness')
+    axes[0, 0].legend()
+    axes[0, 0].set_title('Fitness over Time')
+    axes[0, 0].set_xlabel('Fitness evaluations')
+    axes[0, 0].set_ylabel('Fitness')
+
+    axes[0, 1].plot(evaluations, telemetry["best_energy"], label='Best Energy')
+    axes[0, 1].plot(evaluations, telemetry["avg_energy"], label='Average Energy')
+    axes[0, 1].legend()
+    axes[0, 1].set_title('Energy over Time')
+    axes[0, 1].set_xlabel('Fitness evaluations')
+    axes[0, 1].set_ylabel('Energy')
+
+    axes[1, 0].plot(evaluations, telemetry["agents"], label='Number of Agents')
+    axes[1, 0].legend()
+    axes[1, 0].set_title('Agents over Time')
+    axes[1, 0].set_xlabel('Fitness evaluations')
+    axes[1, 0].set_ylabel('Number of Agents')
+
+    axes[1, 1].plot(evaluations, telemetry["std_min"], label='Minimum Std Dev')
+    axes[1, 1].plot(evaluations, telemetry["std_max"], label='Maximum Std Dev')
+    axes[1, 1].legend()
+    axes[1, 1].set_title('Diversity over Time')
+    axes[1, 1].set_xlabel('Fitness evaluations')
+    axes[1, 1].set_ylabel('Standard Deviation')
+
+    axes[2, 0].plot(evaluations, telemetry["born_agents"], label='Born Agents')
+    axes[2, 0].plot(evaluations, telemetry["dead_agents"], label='Dead Agents')
+    axes[2, 0].legend()
+    axes[2, 0].set_title('Total Born and Dead Agents over Time')
+    axes[2, 0].set_xlabel('Fitness evaluations')
+    axes[2, 0].set_ylabel('Number of Agents')
+
+    axes[2, 1].plot(evaluations, telemetry["energy_sum"], label='Total Energy')
+    axes[2, 1].legend()
+    axes[2, 1].set_title('Total Energy over Time')
+    axes[2, 1].set_xlabel('Fitness evaluations')
+    axes[2, 1].set_ylabel('Energy')
+
+    # plt.show()
+    plt.savefig(file_name)
+    plt.close(fig)
+
+
+def save_to_file(file_name, result, output):
+    saved = {key: result.config[key] for key in result.config
+             if key not in ("function", "dimensions", "numberOfAgents", "telemetryDirectory", "verbose")}
+    saved['function'] = result.function_name
+    saved['agents'] = result.config["numberOfAgents"]
+    saved['dimensions'] = result.config["dimensions"]
+    saved['output'] = output
+    saved['time'] = result.time
+    try:
+        with open(file_name, 'a+') as file:
+            json.dump(saved, file, indent=4)
+            file.write('\n')
+    except Exception as e:
+        print("Error while saving results to file:", e)
@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
 
 LB = -100
 UB = 100
@@ -12,11 +10,25 @@ def func(x):
     return 0.5 + (np.square(np.sin(np.square(x)-np.square(y))) - 0.5)/np.square(1+0.001*(np.square(x)+np.square(y)))
 
 
+def func_batch(x):
+    x = np.asarray(x, dtype=float)
+    return func(x.T)
+
+
+# Schaffer couples the first two coordinates, so it has no per-coordinate
+# terms and is always evaluated in full.
+func_terms = None
+func_offset = None
+
+
 def generate_points(min_val, max_val, num_points):
     return np.linspace(min_val, max_val, num_points)
 
 
 if __name__ == "__main__":
+    import matplotlib
+    import matplotlib.pyplot as plt
+
     dimension, amount_of_points = 2, 100
     X = generate_points(LB, UB, amount_of_points)
     Y = generate_points(LB, UB, amount_of_points)
@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
 
 LB = -500
 UB = 500
@@ -8,8 +6,20 @@ funcName = "Schwefel"
 
 
 def func(x):
-    dim = len(x)
-    return 418.9829 * dim - np.sum([(x_i * np.sin(np.sqrt(np.abs(x_i)))) for x_i in x])
+    return func_batch(np.asarray(x, dtype=float)[np.newaxis])[0]
+
+
+def func_batch(x):
+    x = np.asarray(x, dtype=float)
+    return func_offset(x.shape[1]) + np.sum(func_terms(x), axis=1)
+
+
+def func_terms(x):
+    return -x * np.sin(np.sqrt(np.abs(x)))
+
+
+def func_offset(dimensions):
+    return 418.9829 * dimensions
 
 
 def generate_points(min_val, max_val, num_points):
@@ -17,6 +27,9 @@ def generate_points(min_val, max_val, num_points):
 
 
 if __name__ == "__main__":
+    import matplotlib
+    import matplotlib.pyplot as plt
+
     dimension, amount_of_points = 2, 100
     X = generate_points(LB, UB, amount_of_points)
     Y = generate_points(LB, UB, amount_of_points)
@@ -1,6 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
 
 LB = -5.12
 UB = 5.12
@@ -8,7 +6,20 @@ funcName = "Sphere"
 
 
 def func(x):
-    return np.sum([xi ** 2 for xi in x])
+    return func_batch(np.asarray(x, dtype=float)[np.newaxis])[0]
+
+
+def func_batch(x):
+    x = np.asarray(x, dtype=float)
+    return func_offset(x.shape[1]) + np.sum(func_terms(x), axis=1)
+
+
+def func_terms(x):
+    return x ** 2
+
+
+def func_offset(dimensions):
+    return 0.0
 
 
 def generate_points(min_val, max_val, num_points):
@@ -16,6 +27,9 @@ def generate_points(min_val, max_val, num_points):
 
 
 if __name__ == "__main__":
+    import matplotlib
+    import matplotlib.pyplot as plt
+
     dimension, amount_of_points = 2, 100
     X = generate_points(LB, UB, amount_of_points)
     Y = generate_points(LB, UB, amount_of_points)
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from energy import to_units
+from main import Agent, EMAS, Result, benchmarks, random_population, run_settings, settings
+from pairing import fight_pairings
+from termination import Stall, Termination, termination_criteria
+
+steady_state_settings = {
+    "maxInFlight": os.cpu_count() or 1
+}
+
+
+class LatencyService:
+    """Local stand-in for a remote evaluation service: every request waits
+    for a random latency drawn uniformly from ``latency`` seconds before
+    ``function_batch`` is applied."""
+
+    def __init__(self, function_batch, latency=(0.01, 0.1), rng=None):
+        self.function_batch = function_batch
+        self.latency = latency
+        self.rng = np.random.default_rng(rng)
+
+    async def evaluate(self, x):
+        await asyncio.sleep(self.rng.uniform(*self.latency))
+        return self.function_batch(x)
+
+
+class EvaluatorService:
+    """Runs the blocking ``submit`` of an EMAS evaluator in a thread."""
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+
+    async def evaluate(self, x):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.evaluator.submit(x).result())
+
+
+class SteadyStateEMAS(EMAS):
+    """EMAS without generations.
+
+    While fewer than ``maxInFlight`` pairs of newborns are being evaluated,
+    random pairs of agents meet: agents above the reproduction energy breed
+    and submit their newborns, the others fight. Every agent meets at most
+    once per attempt to fill the free slots, so meetings stop when nobody
+    can reproduce until an evaluation comes back. The better newborn of
+    every evaluated pair then joins the population. Newborns only join once
+    evaluated, so every fight is between agents with known fitness."""
+
+    def __init__(self, config, telemetry_directory, service=None):
+        super().__init__(config, telemetry_directory)
+        self.service = service or EvaluatorService(self.evaluator)
+        self.busy_time = 0.0
+
+    async def evaluate_service(self, x):
+        start_time = time.perf_counter()
+        fitness = await self.service.evaluate(x)
+        self.busy_time += time.perf_counter() - start_time
+        return np.asarray(fitness, dtype=float)
+
+    async def evaluate_pair(self, newborns):
+        """Fitness of the newborns and the number of evaluations to count."""
+        if self.fitnessCache is None:
+            return await self.evaluate_service(newborns), len(newborns)
+
+        keys, fitness, terms, evaluate = self.fitnessCache.lookup(newborns)
+        evaluated = await self.evaluate_service(newborns[evaluate]) if len(evaluate) else np.empty(0)
+        fitness, _ = self.fitnessCache.complete(keys, fitness, terms, evaluate, evaluated)
+        return fitness, len(newborns) if self.config["fitnessCacheHitsCount"] else len(evaluate)
+
+    def meet(self, in_flight, budget, submitted):
+        """Let random pairs meet until the free slots are filled and return
+        the number of newborns submitted."""
+        req_energy = to_units(self.config["reproduceReqEnergy"], self.energyScale)
+        newborns_submitted = 0
+        for agent1, agent2 in zip(*fight_pairings[self.config["fightPairing"]](self.population, self.rng)):
+            if len(in_flight) >= self.config["maxInFlight"] or submitted + newborns_submitted >= budget:
+                break
+
+            energy = self.population.energy
+            if energy[agent1] > req_energy and energy[agent2] > req_energy:
+                newborns, _, newborn_energy = self.breed(np.array([agent1]), np.array([agent2]))
+                # only the first newborn is evaluated when one evaluation is left
+                newborns = newborns[:budget - submitted - newborns_submitted]
+                in_flight[asyncio.ensure_future(self.evaluate_pair(newborns))] = (newborns, newborn_energy[0])
+                newborns_submitted += len(newborns)
+            else:
+                Agent.fight(self.population, agent1, agent2, self.config["fightLossEnergy"], self.config)
+
+        self.numberOfDeadAgents += self.clear()
+        return newborns_submitted
+
+    def join(self, newborns, energy, fitness, evaluations):
+        self.count_evaluations(evaluations)
+        better = int(np.argmin(fitness))
+        self.statistics.born(newborns[better:better + 1])
+        self.population.extend(newborns[better], energy, fitness[better])
+        self.numberOfBornAgents += 1
+        self.numberOfDeadAgents += self.evict()
+
+    async def run(self, termination):
+        """Run until ``termination`` is done, the newborns in flight by then
+        still join the population."""
+        in_flight = {}
+        budget = self.evaluationBudget
+        submitted = self.numberOfFitnessEvaluations
+        while True:
+            if termination.reason is None and termination.done(self) \
+                    and termination.reason == Stall.reason and in_flight:
+                # a stall is final only with no energy set aside for newborns
+                termination.reason = None
+            if termination.reason is None and submitted < budget and len(self.population) >= 2:
+                submitted += self.meet(in_flight, budget, submitted)
+            if not in_flight:
+                if termination.reason is not None:
+                    break
+                continue
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                newborns, energy = in_flight.pop(task)
+                fitness, evaluations = task.result()
+                self.join(newborns, energy, fitness, evaluations)
+                # cache hits which do not count give the budget back
+                submitted -= len(newborns) - evaluations
+
+
+def run_steady_state(config=None, service=None):
+    """Run steady-state EMAS and return its ``Result`` with the fraction of
+    the evaluation slots that were busy as ``utilisation``.
+
+    :param config: Overrides of ``settings``, ``run_settings`` and
+        ``steady_state_settings``.
+    :param service: Object with an ``async evaluate(x)`` method, the run's
+        evaluator in a thread by default.
+    """
+    config = {**settings, **run_settings, **steady_state_settings, **(config or {})}
+    # newborns are evaluated without their parents' terms
+    config["deltaEvaluation"] = False
+    function_name = benchmarks[config["function"]].funcName
+
+    start_time = time.time()
+    telemetry_directory = config["telemetryDirectory"]
+    if telemetry_directory is None:
+        telemetry_directory = "results/"+function_name+"_"+str(start_time)+"_telemetry"
+
+    emas = SteadyStateEMAS(config, telemetry_directory, service)
+    emas.setPopulation(random_population(config, emas.lowerBound, emas.upperBound, emas.rng))
+
+    termination = Termination(termination_criteria(
+        config, to_units(config["reproduceReqEnergy"], emas.energyScale)))
+    run_start = time.perf_counter()
+    asyncio.run(emas.run(termination))
+    run_time = time.perf_counter() - run_start
+
+    emas.close()
+    result = Result(config, function_name, emas, telemetry_directory, time.time() - start_time)
+    result.termination_reason = termination.reason
+    result.utilisation = emas.busy_time / (run_time * config["maxInFlight"]) if run_time > 0 else 0.0
+    return result
+
+
+if __name__ == "__main__":
+    # evaluation times varying by 10x on a stand-in service, with enough agents
+    # to keep the slots filled
+    service = LatencyService(benchmarks[run_settings["function"]].func_batch, latency=(0.01, 0.1))
+    result = run_steady_state({"maxInFlight": 8, "numberOfAgents": 100}, service)
+
+    print("Number of agents left:", result.agents)
+    print("Total number of fitness evaluations:", result.evaluations)
+    print(f"Best fitness: {result.best_fitness:.2f} in {result.time:.2f} seconds")
+    print(f"Evaluation slot utilisation: {result.utilisation:.1%}")
+    print("Stopped by:", result.termination_reason)
@@ -0,0 +1,254 @@
+import json
+import os
+
+import numpy as np
+
+COLUMNS = (
+    "evaluations",
+    "agents",
+    "born_agents",
+    "dead_agents",
+    "best_fitness",
+    "avg_fitness",
+    "best_energy",
+    "avg_energy",
+    "std_min",
+    "std_max",
+    "energy_sum"
+)
+
+
+class RunningMoments:
+    """Per-dimension mean and variance of a changing set of genotypes.
+
+    Rows are added and removed in batches with the pairwise (Chan et al.)
+    form of Welford's update, so keeping the moments costs O(k * D) for k
+    changed rows instead of O(N * D) per query."""
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.reset()
+
+    def reset(self, x=None):
+        self.count = 0
+        self.mean = np.zeros(self.dimensions)
+        self.m2 = np.zeros(self.dimensions)
+        if x is not None:
+            self.add(x)
+
+    def add(self, x):
+        count = len(x)
+        if count == 0:
+            return
+
+        batch_mean = np.mean(x, axis=0)
+        batch_m2 = np.sum((x - batch_mean) ** 2, axis=0)
+
+        total = self.count + count
+        delta = batch_mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def remove(self, x):
+        count = len(x)
+        if count == 0:
+            return
+        if count >= self.count:
+            self.reset()
+            return
+
+        batch_mean = np.mean(x, axis=0)
+        batch_m2 = np.sum((x - batch_mean) ** 2, axis=0)
+
+        rest = self.count - count
+        rest_mean = (self.count * self.mean - count * batch_mean) / rest
+        self.m2 -= batch_m2 + (batch_mean - rest_mean) ** 2 * rest * count / self.count
+        np.maximum(self.m2, 0.0, out=self.m2)
+        self.mean = rest_mean
+        self.count = rest
+
+    def std(self):
+        if self.count == 0:
+            return np.full(self.dimensions, np.nan)
+        return np.sqrt(self.m2 / self.count)
+
+
+class StatisticsCollector:
+    """Population statistics sampled on a fixed cadence.
+
+    A row (see ``COLUMNS``) is recorded every ``evaluation_interval``
+    fitness evaluations and/or every ``iteration_interval`` iterations.
+    The genotype diversity comes from ``RunningMoments`` fed with births
+    and deaths, and is resynchronised with the population every
+    ``resync_interval`` rows to bound rounding drift.
+
+    :param sink: Object with an ``append(row)`` method receiving the rows.
+    """
+
+    def __init__(self, dimensions, evaluation_interval=None, iteration_interval=None,
+                 resync_interval=100, sink=None):
+        self.evaluation_interval = evaluation_interval
+        self.iteration_interval = iteration_interval
+        self.resync_interval = resync_interval
+        self.sink = [] if sink is None else sink
+
+        self.moments = RunningMoments(dimensions)
+        self.next_evaluation = evaluation_interval or 0
+        self.iterations = 0
+        self.rows_since_resync = 0
+
+    def reset(self, population):
+        self.moments.reset(population.x)
+        self.rows_since_resync = 0
+
+    def state(self):
+        return {"count": self.moments.count, "mean": self.moments.mean.copy(),
+                "m2": self.moments.m2.copy(), "next_evaluation": self.next_evaluation,
+                "iterations": self.iterations, "rows_since_resync": self.rows_since_resync}
+
+    def restore(self, state):
+        self.moments.count = state["count"]
+        self.moments.mean = state["mean"].copy()
+        self.moments.m2 = state["m2"].copy()
+        self.next_evaluation = state["next_evaluation"]
+        self.iterations = state["iterations"]
+        self.rows_since_resync = state["rows_since_resync"]
+
+    def born(self, x):
+        self.moments.add(x)
+
+    def died(self, x):
+        self.moments.remove(x)
+
+    def after_evaluations(self, population, evaluations, born_agents, dead_agents):
+        if not self.evaluation_interval or evaluations < self.next_evaluation:
+            return None
+
+        self.next_evaluation = (evaluations // self.evaluation_interval + 1) * self.evaluation_interval
+        return self.record(population, evaluations, born_agents, dead_agents)
+
+    def after_iteration(self, population, evaluations, born_agents, dead_agents):
+        self.iterations += 1
+        if not self.iteration_interval or self.iterations % self.iteration_interval:
+            return None
+
+        return self.record(population, evaluations, born_agents, dead_agents)
+
+    def record(self, population, evaluations, born_agents, dead_agents):
+        if len(population) == 0:
+            return None
+
+        self.rows_since_resync += 1
+        if self.rows_since_resync >= self.resync_interval:
+            self.reset(population)
+
+        std = self.moments.std()
+        best_agent = population.best()
+        energy = population.energy / population.energy_scale
+        row = (
+            evaluations,
+            len(population),
+            born_agents,
+            dead_agents,
+            population.fitness[best_agent],
+            np.mean(population.fitness),
+            energy[best_agent],
+            np.mean(energy),
+            np.min(std),
+            np.max(std),
+            np.sum(population.energy) / population.energy_scale
+        )
+        self.sink.append(row)
+
+        return row
+
+
+class ColumnarSink:
+    """Append-only columnar storage of telemetry rows with flat memory use.
+
+    Rows are buffered in a preallocated ``(len(columns), chunk_rows)`` array
+    and every full buffer is written to ``directory`` as one
+    ``chunk_<n>.npy`` file, so each column of a chunk is contiguous on disk.
+    ``index.json`` lists the columns and the chunks written so far and is
+    replaced atomically after every flush. Use ``load_telemetry`` to read
+    the columns back through memory maps."""
+
+    def __init__(self, directory, columns=COLUMNS, chunk_rows=4096):
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+        self.flushed_rows = 0
+
+        self._buffer = np.empty((len(self.columns), chunk_rows))
+        self._rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return self.flushed_rows + self._rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, row):
+        self._buffer[:, self._rows] = row
+        self._rows += 1
+        if self._rows == self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows == 0:
+            return
+
+        file_name = f"chunk_{len(self.chunks):06d}.npy"
+        np.save(os.path.join(self.directory, file_name), self._buffer[:, :self._rows])
+        self.chunks.append({"file": file_name, "rows": self._rows})
+        self.flushed_rows += self._rows
+        self._rows = 0
+        self._write_index()
+
+    def close(self):
+        self.flush()
+        self._write_index()
+
+    def state(self):
+        return {"chunks": [dict(chunk) for chunk in self.chunks], "flushed_rows": self.flushed_rows,
+                "buffer": self._buffer[:, :self._rows].copy()}
+
+    def restore(self, state):
+        """Continue from ``state``, chunks written after it are overwritten."""
+        self.chunks = [dict(chunk) for chunk in state["chunks"]]
+        self.flushed_rows = state["flushed_rows"]
+        self._rows = state["buffer"].shape[1]
+        self._buffer[:, :self._rows] = state["buffer"]
+        self._write_index()
+
+    def _write_index(self):
+        index_path = os.path.join(self.directory, "index.json")
+        with open(index_path + ".tmp", "w") as file:
+            json.dump({"columns": self.columns, "chunks": self.chunks}, file, indent=4)
+        os.replace(index_path + ".tmp", index_path)
+
+
+def load_telemetry(directory):
+    """Columns written by ``ColumnarSink`` as a dict of arrays.
+
+    Chunks are memory-mapped, so only the columns that are used are read;
+    a column spanning several chunks is concatenated into memory."""
+    with open(os.path.join(directory, "index.json")) as file:
+        index = json.load(file)
+
+    chunks = [np.load(os.path.join(directory, chunk["file"]), mmap_mode="r")
+              for chunk in index["chunks"]]
+    telemetry = {}
+    for i, name in enumerate(index["columns"]):
+        if len(chunks) == 1:
+            telemetry[name] = chunks[0][i]
+        else:
+            telemetry[name] = np.concatenate([chunk[i] for chunk in chunks] or [np.empty(0)])
+
+    return telemetry
@@ -0,0 +1,154 @@
+import math
+import time
+
+import numpy as np
+
+
+class EvaluationBudget:
+    reason = "evaluation budget"
+
+    def __init__(self, max_evaluations):
+        self.max_evaluations = max_evaluations
+
+    def reached(self, emas, elapsed_time):
+        return emas.numberOfFitnessEvaluations >= self.max_evaluations
+
+
+class TimeBudget:
+    reason = "time budget"
+
+    def __init__(self, max_time):
+        self.max_time = max_time
+
+    def reached(self, emas, elapsed_time):
+        return elapsed_time >= self.max_time
+
+
+class TargetFitness:
+    reason = "target fitness"
+
+    def __init__(self, target_fitness):
+        self.target_fitness = target_fitness
+
+    def reached(self, emas, elapsed_time):
+        return len(emas.population) > 0 and np.min(emas.population.fitness) <= self.target_fitness
+
+
+class Stagnation:
+    """Reached after ``evaluations`` evaluations without the best fitness
+    improving by more than ``tolerance``."""
+    reason = "stagnation"
+
+    def __init__(self, evaluations, tolerance=0.0):
+        self.evaluations = evaluations
+        self.tolerance = tolerance
+        self.best_fitness = math.inf
+        self.last_improvement = 0
+
+    def state(self):
+        return {"best_fitness": float(self.best_fitness), "last_improvement": self.last_improvement}
+
+    def restore(self, state):
+        self.best_fitness = state["best_fitness"]
+        self.last_improvement = state["last_improvement"]
+
+    def reached(self, emas, elapsed_time):
+        if len(emas.population) > 0:
+            best_fitness = np.min(emas.population.fitness)
+            if best_fitness < self.best_fitness - self.tolerance:
+                self.best_fitness = best_fitness
+                self.last_improvement = emas.numberOfFitnessEvaluations
+        return emas.numberOfFitnessEvaluations - self.last_improvement >= self.evaluations
+
+
+class CacheSaturation:
+    """Reached after ``hits`` fitness cache hits without a miss. Hits that
+    do not count as evaluations leave the budget untouched, so a run whose
+    newborns only hit the cache would never end otherwise."""
+    reason = "cache saturation"
+
+    def __init__(self, hits):
+        self.hits = hits
+        self.misses = 0
+        self.hits_at_last_miss = 0
+
+    def state(self):
+        return {"misses": self.misses, "hits_at_last_miss": self.hits_at_last_miss}
+
+    def restore(self, state):
+        self.misses = state["misses"]
+        self.hits_at_last_miss = state["hits_at_last_miss"]
+
+    def reached(self, emas, elapsed_time):
+        cache = emas.fitnessCache
+        if cache.misses != self.misses:
+            self.misses = cache.misses
+            self.hits_at_last_miss = cache.hits
+        return cache.hits - self.hits_at_last_miss >= self.hits
+
+
+class Stall:
+    """Reached when no two agents can ever reproduce again: energy is
+    conserved, so a population holding less than twice the reproduction
+    energy (in units, see ``energy.py``) makes no more evaluations."""
+    reason = "stall"
+
+    def __init__(self, req_energy):
+        self.req_energy = req_energy
+
+    def reached(self, emas, elapsed_time):
+        energy = emas.population.energy
+        return len(energy) < 2 or int(np.sum(energy)) < 2 * (self.req_energy + 1)
+
+
+class Termination:
+    """Stops a run at the first reached criterion, remembered in
+    ``reason``. Criteria are checked between iterations, the evaluation
+    budget is also enforced within them by ``EMAS.reproduce``.
+
+    :param criteria: Objects with a ``reached(emas, elapsed_time)`` method
+        and a ``reason``.
+    :param elapsed_time: Time the run already took, when it is resumed.
+    """
+
+    def __init__(self, criteria, elapsed_time=0.0):
+        self.criteria = criteria
+        self.start_time = time.perf_counter() - elapsed_time
+        self.reason = None
+
+    def state(self):
+        return {str(i): criterion.state() for i, criterion in enumerate(self.criteria)
+                if hasattr(criterion, "state")}
+
+    def restore(self, state):
+        for i, criterion_state in state.items():
+            self.criteria[int(i)].restore(criterion_state)
+
+    def elapsed_time(self):
+        return time.perf_counter() - self.start_time
+
+    def done(self, emas):
+        elapsed_time = self.elapsed_time()
+        for criterion in self.criteria:
+            if criterion.reached(emas, elapsed_time):
+                self.reason = criterion.reason
+                return True
+        return False
+
+
+def termination_criteria(config, req_energy):
+    """Criteria of the ``maxNumberOfFitnessEvaluations``, ``maxTime``,
+    ``targetFitness`` and ``stagnationEvaluations`` settings which are not
+    None, the saturation of a fitness cache whose hits do not count, and the
+    stall of a population with ``req_energy`` units."""
+    criteria = [EvaluationBudget(config["maxNumberOfFitnessEvaluations"])]
+    if config["maxTime"] is not None:
+        criteria.append(TimeBudget(config["maxTime"]))
+    if config["targetFitness"] is not None:
+        criteria.append(TargetFitness(config["targetFitness"]))
+    if config["stagnationEvaluations"] is not None:
+        criteria.append(Stagnation(config["stagnationEvaluations"], config["stagnationTolerance"]))
+    if config["fitnessCacheBytes"] and not config["fitnessCacheHitsCount"]:
+        criteria.append(CacheSaturation(config["fitnessCacheHitStreak"]))
+    criteria.append(Stall(req_energy))
+    return criteria
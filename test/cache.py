@@ -0,0 +1,71 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _local_module(obj):
+    module = obj if inspect.ismodule(obj) else sys.modules.get(getattr(obj, "__module__", None) or "")
+    path = getattr(module, "__file__", None)
+    if path is None or not os.path.abspath(path).startswith(ROOT_DIR + os.sep):
+        return None
+    return module
+
+
+def source_hash(module):
+    """Hash of the sources of ``module`` and of every module of this
+    repository it uses, directly or through other modules."""
+    modules, pending = {}, [module]
+    while pending:
+        module = pending.pop()
+        if module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        for value in list(vars(module).values()):
+            used = _local_module(value)
+            if used is not None and used.__name__ not in modules:
+                pending.append(used)
+
+    digest = hashlib.sha256()
+    for name in sorted(modules):
+        with open(modules[name].__file__, 'rb') as file:
+            digest.update(name.encode())
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed store of finished campaign cells.
+
+    Every cell is one JSON file named after the hash of its key, written
+    atomically, so concurrent workers can fill the store and an interrupted
+    campaign keeps everything finished before the interruption."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(**fields):
+        return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(value, file)
+        os.replace(temporary_path, path)
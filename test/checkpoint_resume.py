@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# the root modules go first, test/ has benchmark modules of the same names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from checkpoint import read_checkpoint
+from main import resume_emas, run_emas
+from telemetry import load_telemetry
+
+CONFIGS = {
+    "default": {},
+    "delta evaluation": {"deltaEvaluationMinDimensions": 0},
+    "delta evaluation, half mutated": {"deltaEvaluationMinDimensions": 0, "mutation_probability": 0.5},
+    "neighbour fights": {"fightPairing": "neighbours"},
+    "fitness cache and stagnation": {"fitnessCacheBytes": 10**7, "fitnessCacheQuantum": 0.01,
+                                     "stagnationEvaluations": 10**6},
+    "evictions": {"numberOfAgents": 40, "maxNumberOfAgents": 30, "startEnergy": 2000}
+}
+
+
+def assert_same_run(name, result, reference):
+    for attribute in ("evaluations", "agents", "born_agents", "dead_agents", "best_fitness",
+                      "cache_hits", "cache_misses", "termination_reason"):
+        assert getattr(result, attribute) == getattr(reference, attribute), \
+            f"{name}: {attribute} {getattr(result, attribute)} != {getattr(reference, attribute)}"
+    assert np.array_equal(result.best_x, reference.best_x), f"{name}: best_x differs"
+
+    telemetry = load_telemetry(result.telemetry_directory)
+    reference_telemetry = load_telemetry(reference.telemetry_directory)
+    for column, values in reference_telemetry.items():
+        assert np.array_equal(telemetry[column], values), f"{name}: telemetry column {column} differs"
+
+
+def check_resume(name, overrides, budget=1900, interval=1000):
+    """A run resumed from a checkpoint taken on the way ends exactly like
+    the same run without checkpoints, telemetry included."""
+    with tempfile.TemporaryDirectory() as directory:
+        config = {"seed": 1, "maxNumberOfFitnessEvaluations": budget, **overrides}
+        reference = run_emas({**config, "telemetryDirectory": os.path.join(directory, "reference")})
+
+        checkpoint_path = os.path.join(directory, "run.checkpoint.npz")
+        checkpointed = run_emas({**config, "telemetryDirectory": os.path.join(directory, "checkpointed"),
+                                 "checkpointPath": checkpoint_path, "checkpointInterval": interval})
+        assert_same_run(f"{name} (checkpointed)", checkpointed, reference)
+
+        evaluations = read_checkpoint(checkpoint_path)["emas"]["numberOfFitnessEvaluations"]
+        assert interval <= evaluations < budget, f"{name}: checkpoint after {evaluations} evaluations"
+
+        resumed = resume_emas(checkpoint_path)
+        assert_same_run(f"{name} (resumed)", resumed, reference)
+
+
+if __name__ == "__main__":
+    for name, overrides in CONFIGS.items():
+        check_resume(name, overrides)
+        print("Resumed exactly:", name)
@@ -1,31 +1,38 @@
-import json
-import math
-import random
-import copy
-import time
+import os
+import sys
+import tempfile
 
 import numpy as np
-import matplotlib.pyplot as plt
 
-from rastrigin import rastrigin
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from energy import energy_scale, fight_remainders, reproduction_loss, to_units
+from pairing import random_pairs
+from operators import crossover_operators, polynomial_mutation
+from population import Population
+from telemetry import ColumnarSink, load_telemetry
+from termination import EvaluationBudget, Stall, Termination
+
+from rastrigin import rastrigin, rastrigin_batch
 from rastrigin import LB as rastrigin_LB
 from rastrigin import UB as rastrigin_UB
 
-from sphere import sphere
+from sphere import sphere, sphere_batch
 from sphere import LB as sphere_LB
 from sphere import UB as sphere_UB
 
-from schwefel import schwefel
+from schwefel import schwefel, schwefel_batch
 from schwefel import LB as schwefel_LB
 from schwefel import UB as schwefel_UB
 
-from schaffer import schaffer
+from schaffer import schaffer, schaffer_batch
 from schaffer import LB as schaffer_LB
 from schaffer import UB as schaffer_UB
 
 settings = {
     "startEnergy": 1000,
     "mutation_probability": 1,
+    "crossover": "two_point",
     "crossover_probability": 0.5,
     "distribution_index": 0.2,
     "fightLossEnergy": 0.98,
@@ -41,265 +48,180 @@ functions = [
     {"func": schwefel, "LB": schwefel_LB, "UB": schwefel_UB},
     {"func": schaffer, "LB": schaffer_LB, "UB": schaffer_UB}
 ]
+batch_functions = {
+    rastrigin: rastrigin_batch,
+    sphere: sphere_batch,
+    schwefel: schwefel_batch,
+    schaffer: schaffer_batch
+}
+telemetry_columns = ("evaluations", "best_fitness")
 no_change = False
 
 class Agent:
-    def __init__(self, x, emas, energy=settings["startEnergy"]):
-        self.x = x
-        self.energy = energy
-        self.emas = emas
-        self.fitness = emas.function(x)
-
-        emas.numberOfFitnessEvaluations += 1
-        emas.update_data()
-
     @staticmethod
-    def crossover(parent1, parent2):
-        parents = [parent1, parent2]
-        offspring = copy.deepcopy(parents)
-        permutation_length = len(offspring[0].x)
-
-        cross_points = sorted(
-            [random.randint(0, permutation_length) for _ in range(2)])
-
-        def _repeated(element, collection):
-            c = 0
-            for e in collection:
-                if e == element:
-                    c += 1
-            return c > 1
-
-        def _swap(data_a, data_b, cross_points):
-            c1, c2 = cross_points
-            new_a = data_a[:c1] + data_b[c1:c2] + data_a[c2:]
-            new_b = data_b[:c1] + data_a[c1:c2] + data_b[c2:]
-            return new_a, new_b
-
-        def _map(swapped, cross_points):
-            n = len(swapped[0])
-            c1, c2 = cross_points
-            s1, s2 = swapped
-            map_ = s1[c1:c2], s2[c1:c2]
-            for i_chromosome in range(n):
-                if not c1 < i_chromosome < c2:
-                    for i_son in range(2):
-                        while _repeated(swapped[i_son][i_chromosome], swapped[i_son]):
-                            try:
-                                map_index = map_[i_son].index(
-                                    swapped[i_son][i_chromosome])
-                                swapped[i_son][i_chromosome] = map_[
-                                    1 - i_son][map_index]
-                            except ValueError as ve:
-                                print('ValueError encountered, Action skipped')
-                                break
-            return s1, s2
-
-        swapped = _swap(parents[0].x, parents[1].x, cross_points)
-        mapped = _map(swapped, cross_points)
-
-        offspring[0].x, offspring[1].x = mapped
-
-        return offspring[0].x, offspring[1].x
+    def crossover(x1, x2, lowerBound, upperBound, rng):
+        crossover_operators[settings["crossover"]](x1, x2, lowerBound, upperBound, rng=rng)
+        return x1, x2
 
     @staticmethod
-    def mutate(x, lowerBound, upperBound):
-        for i in range(len(x)):
-            rand = random.random()
-
-            if rand <= 1 / len(x):
-                y = x[i]
-                yl, yu = lowerBound, upperBound
-
-                if yl == yu:
-                    y = yl
-                else:
-                    delta1 = (y - yl) / (yu - yl)
-                    delta2 = (yu - y) / (yu - yl)
-                    rnd = random.random()
-                    mut_pow = 1.0 / (settings["distribution_index"] + 1.0)
-                    if rnd <= 0.5:
-                        xy = 1.0 - delta1
-                        val = 2.0 * rnd + (1.0 - 2.0 * rnd) * (
-                            pow(xy, settings["distribution_index"] + 1.0))
-                        deltaq = pow(val, mut_pow) - 1.0
-                    else:
-                        xy = 1.0 - delta2
-                        val = 2.0 * (1.0 - rnd) + 2.0 * (rnd - 0.5) * (
-                            pow(xy, settings["distribution_index"] + 1.0))
-                        deltaq = 1.0 - pow(val, mut_pow)
-
-                    y += deltaq * (yu - yl)
-                    if y < lowerBound:
-                        y = lowerBound
-                    if y > upperBound:
-                        y = upperBound
-                x[i] = y
+    def mutate(x, lowerBound, upperBound, rng):
+        polynomial_mutation(x, lowerBound, upperBound, settings["distribution_index"], rng=rng)
         return x
 
     @staticmethod
-    def reproduce(emas, parent1, parent2, loss_energy, f_avg):
-        parent1_loss = math.ceil(parent1.energy * loss_energy)
-        parent1.energy -= parent1_loss
+    def reproduce(emas, parents1, parents2, loss_energy, f_avg):
+        energy = emas.population.energy
+        scale = energy_scale(settings)
 
-        parent2_loss = math.ceil(parent2.energy * loss_energy)
-        parent2.energy -= parent2_loss
+        parents1_loss = reproduction_loss(energy[parents1], loss_energy, scale)
+        energy[parents1] -= parents1_loss
 
-        # Possible crossover
-        if random.random() < settings["crossover_probability"]:
-            newborn_x1, newborn_x2 = Agent.crossover(parent1, parent2)
-        else:
-            newborn_x1, newborn_x2 = Agent.crossover(parent2, parent1)
-
-        mutation_probability_x1 = mutation_probability_x2 = settings["mutation_probability"]
-
-        # if func(newborn_x1) < f_avg:
-        #     mutation_probability_x1 /= 2
-        # else:
-        #     mutation_probability_x1 *= 2
+        parents2_loss = reproduction_loss(energy[parents2], loss_energy, scale)
+        energy[parents2] -= parents2_loss
 
-        # if func(newborn_x2) < f_avg:
-        #     mutation_probability_x2 /= 2
-        # else:
-        #     mutation_probability_x2 *= 2
+        # Possible crossover
+        swapped = emas.rng.random(len(parents1)) >= settings["crossover_probability"]
+        parents1, parents2 = (np.where(swapped, parents2, parents1),
+                              np.where(swapped, parents1, parents2))
+        # the first half of the newborns descends from parents1 and the
+        # second from parents2, the crossover recombines the halves in place
+        newborns = emas.population.x[np.concatenate([parents1, parents2])]
+        Agent.crossover(*np.split(newborns, 2), emas.lowerBound, emas.upperBound, emas.rng)
 
-        random_number = random.random()
-        if random_number < mutation_probability_x1:
-            newborn_x1 = Agent.mutate(
-                newborn_x1, emas.lowerBound, emas.upperBound)
-        if random_number < mutation_probability_x2:
-            newborn_x2 = Agent.mutate(
-                newborn_x2, emas.lowerBound, emas.upperBound)
+        return newborns, parents1_loss + parents2_loss
 
-        newborn1 = Agent(newborn_x1, emas, parent1_loss + parent2_loss)
-        newborn2 = Agent(newborn_x2, emas, parent1_loss + parent2_loss)
+    @staticmethod
+    def fights(population, agents1, agents2, loss_energy):
+        energy, fitness = population.energy, population.fitness
 
-        return newborn1 if newborn1.fitness < newborn2.fitness else newborn2
+        d = np.sum(np.abs(population.x[agents1] - population.x[agents2]), axis=1)
+        won = fitness[agents1] < fitness[agents2]
+        winners = np.where(won, agents1, agents2)
+        losers = np.where(won, agents2, agents1)
 
-    @staticmethod
-    def fight(agent_1, agent_2, loss_energy):
-        # global no_change
-        d = np.sum(np.abs(np.array(agent_1.x) - np.array(agent_2.x)))
-        # if no_change:
-        # print("d: ", d)
-            # print("agent1: ", agent_1.x, " agent2: ", agent_2.x)
-            # no_change = False
-        if agent_1.fitness < agent_2.fitness:
-            energy = agent_2.energy * loss_energy
-            agent_1.energy += energy
-            agent_2.energy -= energy
-            if d < settings["crowdingFactor"]:
-                energy = agent_2.energy * \
-                    (1-d**2/settings["crowdingFactor"]**2)
-                agent_1.energy += energy
-                agent_2.energy -= energy
-        else:
-            energy = agent_1.energy * loss_energy
-            agent_1.energy -= energy
-            agent_2.energy += energy
-            if d < settings["crowdingFactor"]:
-                energy = agent_1.energy * \
-                    (1-d**2/settings["crowdingFactor"]**2)
-                agent_1.energy -= energy
-                agent_2.energy += energy
-
-        agent_1.energy = np.true_divide(np.floor(
-            agent_1.energy * 10**settings["deathThreshold"]), 10**settings["deathThreshold"])
-        agent_2.energy = np.true_divide(np.floor(
-            agent_2.energy * 10**settings["deathThreshold"]), 10**settings["deathThreshold"])
-
-    def is_dead(self):
-        return self.energy <= 0
+        transfer = energy[losers] - fight_remainders(
+            energy[losers], loss_energy, d, settings["crowdingFactor"])
+        energy[winners] += transfer
+        energy[losers] -= transfer
 
 
 class EMAS:
-    def __init__(self, function, lowerBound, upperBound):
+    def __init__(self, function, lowerBound, upperBound, telemetry_directory, seed=None):
+        self.rng = np.random.default_rng(seed)
         self.function = function
+        self.function_batch = batch_functions.get(
+            function, lambda x: np.array([function(agent_x) for agent_x in x]))
         self.lowerBound = lowerBound
         self.upperBound = upperBound
 
-        self.agents = []
+        self.population = None
+        self.evaluationBudget = np.inf
         self.numberOfFitnessEvaluations = 0
         self.emasIsRunning = False
-        self.data = [[], []]
+        self.data = ColumnarSink(telemetry_directory, telemetry_columns)
 
-    def setAgents(self, agents):
-        self.agents = agents
+    def setPopulation(self, population):
+        self.population = population
 
-    def run_iteration(self):
+    def evaluate(self, x):
+        fitness = self.function_batch(x)
+        self.numberOfFitnessEvaluations += len(fitness)
+        self.update_data(len(fitness))
 
-        # shuffle
-        random.shuffle(self.agents)
+        return fitness
+
+    def run_iteration(self):
 
         # reproduce
-        children = self.reproduce()
+        children_x, children_energy, children_fitness = self.reproduce()
 
         # fight
         self.fight()
 
-        # update agents' array
-        self.agents.extend(children)
+        # update agents' arrays
+        self.population.extend(children_x, children_energy, children_fitness)
 
         # remove dead
         dead = self.clear()
 
     def reproduce(self):
-        req_energy = settings["reproduceReqEnergy"]
+        req_energy = to_units(settings["reproduceReqEnergy"], energy_scale(settings))
         loss_energy = settings["reproduceLossEnergy"]
-
-        parents = []
-        children = []
-        for idx, parent1 in enumerate(self.agents):
-            if parent1.energy > req_energy and parent1 not in parents:
-                available_parents = [agent for agent in self.agents if
-                                     agent != parent1 and agent.energy > req_energy and agent not in parents]
-                if available_parents:
-                    parent2 = random.choice(available_parents)
-                    children.append(Agent.reproduce(self, parent1, parent2, loss_energy,
-                                                    np.average([agent.fitness for agent in self.agents])))
-                    parents.extend([parent1, parent2])
-
-        return children
+        f_avg = np.average(self.population.fitness)
+
+        parents1, parents2 = random_pairs(
+            np.flatnonzero(self.population.energy > req_energy), self.rng)
+        # reproduction never starts more evaluations than are left
+        remaining = max(self.evaluationBudget - self.numberOfFitnessEvaluations, 0)
+        pairs = int(min(len(parents1), -(-remaining // 2)))
+
+        return self.select_newborns(
+            *Agent.reproduce(self, parents1[:pairs], parents2[:pairs], loss_energy, f_avg),
+            min(2 * pairs, remaining))
+
+    def select_newborns(self, newborns, energy, evaluated):
+        # one random number per pair decides whether both newborns mutate
+        mutated = np.tile(self.rng.random(len(energy))
+                          < settings["mutation_probability"], 2)
+        if mutated.all():
+            Agent.mutate(newborns, self.lowerBound, self.upperBound, self.rng)
+        elif mutated.any():
+            newborns[mutated] = Agent.mutate(
+                newborns[mutated], self.lowerBound, self.upperBound, self.rng)
+
+        # both newborns of every pair are evaluated in one batch, but for the
+        # second newborn of the last pair when a single evaluation is left
+        fitness = self.evaluate(newborns[:evaluated])
+        fitness = np.concatenate([fitness, np.full(len(newborns) - evaluated, np.inf)])
+        fitness1, fitness2 = np.split(fitness, 2)
+        newborns_x1, newborns_x2 = np.split(newborns, 2)
+
+        better = fitness1 < fitness2
+        return (np.where(better[:, np.newaxis], newborns_x1, newborns_x2),
+                energy, np.where(better, fitness1, fitness2))
 
     def fight(self):
         loss_energy = settings["fightLossEnergy"]
 
-        fighters = []
-        for idx, agent1 in enumerate(self.agents):
-            if agent1 not in fighters:
-                available_fighters = [agent for agent in self.agents if
-                                      agent != agent1 and agent not in fighters]
-                if available_fighters:
-                    agent2 = random.choice(available_fighters)
-                    Agent.fight(agent1, agent2, loss_energy)
-                    fighters.extend([agent1, agent2])
+        Agent.fights(self.population, *random_pairs(len(self.population), self.rng), loss_energy)
 
     def clear(self):
-        dead = [agent for agent in self.agents if agent.is_dead()]
-        self.agents = [agent for agent in self.agents if not agent.is_dead()]
-        return dead
+        return self.population.compact(self.population.energy > 0)
 
-    def update_data(self):
+    def update_data(self, evaluations):
+        """Record a row for every multiple of 100 among the last
+        ``evaluations`` fitness evaluations."""
         if not self.emasIsRunning:
             return
 
-        best_agent = min(self.agents, key=lambda agent: agent.fitness)
-        if self.numberOfFitnessEvaluations % 100 == 0:
-            self.data[0].append(self.numberOfFitnessEvaluations)
-            self.data[1].append(best_agent.fitness)
+        first = self.numberOfFitnessEvaluations - evaluations + 1
+        for evaluation in range(-(-first // 100) * 100, self.numberOfFitnessEvaluations + 1, 100):
+            self.data.append((evaluation, np.min(self.population.fitness)))
+
+
+def run(dimensions, function, lowerBound, upperBound, numberOfAgents, maxNumberOfFitnessEvaluations, seed=None):
+    with tempfile.TemporaryDirectory() as telemetry_directory:
+        return _run(dimensions, function, lowerBound, upperBound, numberOfAgents,
+                    maxNumberOfFitnessEvaluations, telemetry_directory, seed)
 
 
-def run(dimensions, function, lowerBound, upperBound, numberOfAgents, maxNumberOfFitnessEvaluations):
+def _run(dimensions, function, lowerBound, upperBound, numberOfAgents, maxNumberOfFitnessEvaluations, telemetry_directory,
+         seed=None):
     # global no_change
-    emas = EMAS(function, lowerBound, upperBound)
-    agents = [Agent([random.uniform(lowerBound, upperBound) for _ in range(dimensions)], emas=emas)
-              for _ in range(numberOfAgents)]
-    emas.setAgents(agents)
+    emas = EMAS(function, lowerBound, upperBound, telemetry_directory, seed)
+    emas.evaluationBudget = maxNumberOfFitnessEvaluations
+    x = emas.rng.uniform(lowerBound, upperBound, (numberOfAgents, dimensions))
+    scale = energy_scale(settings)
+    emas.setPopulation(Population(x, to_units(settings["startEnergy"], scale), emas.evaluate(x),
+                                  energy_scale=scale))
     emas.emasIsRunning = True
 
-    emas.update_data()
+    emas.update_data(1)
 
+    termination = Termination([EvaluationBudget(maxNumberOfFitnessEvaluations),
+                               Stall(to_units(settings["reproduceReqEnergy"], scale))])
     # prev_num_of_agents = 0
-    while emas.numberOfFitnessEvaluations < maxNumberOfFitnessEvaluations:
+    while not termination.done(emas):
         # print(test_nr+" func: "+function.__name__+" ")
         # for i in range(nr_test):
             # print("    ", end="")
@@ -312,12 +234,17 @@ def run(dimensions, function, lowerBound, upperBound, numberOfAgents, maxNumberO
         # prev_num_of_agents = len(emas.agents)
         emas.run_iteration()
 
-    best_agent = min(emas.agents, key=lambda agent: agent.fitness)
-
-    for i in range(len(best_agent.x)):
-        best_agent.x[i] = round(best_agent.x[i], 2)
-
-    return emas.data
+    if termination.reason == Stall.reason:
+        # the population can no longer change, its best fitness holds for
+        # the rest of the budget so that all runs share the checkpoints
+        best_fitness = np.min(emas.population.fitness) if len(emas.population) else np.inf
+        first = emas.numberOfFitnessEvaluations // 100 * 100 + 100
+        for evaluation in range(first, maxNumberOfFitnessEvaluations + 1, 100):
+            emas.data.append((evaluation, best_fitness))
+
+    emas.data.close()
+    telemetry = load_telemetry(telemetry_directory)
+    return [telemetry["evaluations"].astype(int).tolist(), telemetry["best_fitness"].tolist()]
 
 
 if __name__ == "__main__":
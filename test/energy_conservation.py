@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+# the root modules go first, test/ has benchmark modules of the same names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from main import EMAS, random_population, run_settings, settings
+
+CONFIGS = {
+    "default": {},
+    "odd agents": {"numberOfAgents": 21},
+    "delta evaluation": {"deltaEvaluationMinDimensions": 0},
+    "delta evaluation, half mutated": {"deltaEvaluationMinDimensions": 0, "mutation_probability": 0.5},
+    "neighbour fights": {"fightPairing": "neighbours"},
+    "evictions": {"numberOfAgents": 40, "maxNumberOfAgents": 25},
+    "fitness evictions": {"numberOfAgents": 40, "maxNumberOfAgents": 25, "evictionKey": "fitness"},
+    "sphere": {"function": "sphere", "dimensions": 10}
+}
+
+
+def check_energy_conservation(name, overrides, iterations=300):
+    """The population's total energy units never change between iterations."""
+    with tempfile.TemporaryDirectory() as directory:
+        config = {**settings, **run_settings, "seed": 1, "maxNumberOfFitnessEvaluations": 10**6,
+                  "statisticsEvaluationInterval": None, **overrides}
+        emas = EMAS(config, os.path.join(directory, "telemetry"))
+        emas.setPopulation(random_population(config, emas.lowerBound, emas.upperBound, emas.rng))
+        total = int(emas.population.energy.sum())
+
+        for iteration in range(iterations):
+            if len(emas.population) < 2:
+                break
+            emas.run_iteration()
+            energy = int(emas.population.energy.sum())
+            assert energy == total, f"{name}: {energy} units after iteration {iteration}, expected {total}"
+            assert (emas.population.energy > 0).all(), f"{name}: agent without energy survived"
+        emas.close()
+
+
+if __name__ == "__main__":
+    for name, overrides in CONFIGS.items():
+        check_energy_conservation(name, overrides)
+        print("Energy conserved:", name)
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+
+# the root modules go first, test/ has benchmark modules of the same names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from islands import run_islands
+from main import run_emas
+from steady_state import run_steady_state
+
+BUDGETS = (1000, 1001, 777, 41)
+
+CONFIGS = {
+    "default": {},
+    "odd agents": {"numberOfAgents": 21},
+    "delta evaluation": {"deltaEvaluationMinDimensions": 0},
+    "fitness cache": {"fitnessCacheBytes": 10**7},
+    "counted cache hits": {"fitnessCacheBytes": 10**7, "fitnessCacheHitsCount": True}
+}
+
+
+def check_budget(run, name, overrides, budget):
+    """A run with ``maxNumberOfFitnessEvaluations`` of ``budget`` makes
+    exactly that many evaluations."""
+    with tempfile.TemporaryDirectory() as directory:
+        result = run({"seed": 1, "maxNumberOfFitnessEvaluations": budget,
+                      "telemetryDirectory": os.path.join(directory, "telemetry"), **overrides})
+    assert result.evaluations == budget, f"{name}: {result.evaluations} evaluations of {budget}"
+    return result
+
+
+def check_cache_saturation(run, name):
+    """A run whose newborns only hit the cache stops, and counts only the
+    real evaluations."""
+    with tempfile.TemporaryDirectory() as directory:
+        result = run({"seed": 1, "fitnessCacheBytes": 10**7, "fitnessCacheQuantum": 100.0,
+                      "telemetryDirectory": os.path.join(directory, "telemetry")})
+    assert result.termination_reason == "cache saturation", f"{name}: {result.termination_reason}"
+    assert result.evaluations == result.cache_misses, \
+        f"{name}: {result.evaluations} evaluations of {result.cache_misses} misses"
+
+
+if __name__ == "__main__":
+    check_cache_saturation(run_emas, "coarse fitness cache")
+    check_cache_saturation(run_steady_state, "steady state coarse fitness cache")
+    print("Stopped by cache saturation: coarse fitness cache")
+
+    for name, overrides in CONFIGS.items():
+        for budget in BUDGETS:
+            result = check_budget(run_emas, name, overrides, budget)
+            assert result.termination_reason == "evaluation budget", f"{name}: {result.termination_reason}"
+            result = check_budget(run_steady_state, f"steady state {name}", overrides, budget)
+            assert result.termination_reason == "evaluation budget", f"{name}: {result.termination_reason}"
+        print("Exact budget:", name)
+
+    for islands, budget in ((3, 1000), (4, 1001), (5, 777)):
+        result = check_budget(run_islands, f"{islands} islands", {"islands": islands}, budget)
+        print(f"Exact budget: {islands} islands", [island.evaluations for island in result.results])
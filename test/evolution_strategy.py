@@ -1,6 +1,6 @@
 from jmetal.algorithm.singleobjective.evolution_strategy import EvolutionStrategy
 from jmetal.operator import PolynomialMutation, SBXCrossover
-from problem import Rastrigin, Sphere, Schwefel, Schaffer
+from problem import Rastrigin, Sphere, Schwefel, Schaffer, BatchEvaluator
 from jmetal.util.comparator import DominanceComparator
 from jmetal.util.solution import print_function_values_to_file, print_variables_to_file, get_non_dominated_solutions, print_function_values_to_file
 from jmetal.util.termination_criterion import StoppingByEvaluations
@@ -60,6 +60,7 @@ def solve(problem, numberOfAgents, maxNumberOfFitnessEvaluations):
             probability=1.0 / problem.number_of_variables()),
         termination_criterion=StoppingByEvaluations(
             max_evaluations=maxNumberOfFitnessEvaluations),
+        population_evaluator=BatchEvaluator(),
     )
     data = [[], []]
     algorithm.observable.register(observer=PrintObjectivesObserver(100, data))
@@ -1,5 +1,5 @@
 from jmetal.algorithm.multiobjective.gde3 import GDE3
-from problem import Rastrigin, Sphere, Schwefel, Schaffer
+from problem import Rastrigin, Sphere, Schwefel, Schaffer, BatchEvaluator
 from jmetal.util.termination_criterion import StoppingByEvaluations
 from jmetal.util.observer import Observer
 import matplotlib.pyplot as plt
@@ -52,7 +52,8 @@ def solve(problem, numberOfAgents, maxNumberOfFitnessEvaluations):
         cr=0.5,
         f=0.5,
         termination_criterion=StoppingByEvaluations(
-            maxNumberOfFitnessEvaluations)
+            maxNumberOfFitnessEvaluations),
+        population_evaluator=BatchEvaluator()
     )
 
     data = [[], []]
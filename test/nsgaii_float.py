@@ -1,6 +1,6 @@
 from jmetal.algorithm.multiobjective.nsgaii import NSGAII
 from jmetal.operator import PolynomialMutation, SBXCrossover
-from problem import Rastrigin, Sphere, Schwefel, Schaffer
+from problem import Rastrigin, Sphere, Schwefel, Schaffer, BatchEvaluator
 from jmetal.util.comparator import DominanceComparator
 from jmetal.util.solution import print_function_values_to_file, print_variables_to_file, get_non_dominated_solutions, print_function_values_to_file
 from jmetal.util.termination_criterion import StoppingByEvaluations
@@ -61,6 +61,7 @@ def solve(problem, numberOfAgents, maxNumberOfFitnessEvaluations):
         crossover=SBXCrossover(probability=0.9, distribution_index=20.0),
         termination_criterion=StoppingByEvaluations(
             max_evaluations=max_evaluations),
+        population_evaluator=BatchEvaluator(),
         dominance_comparator=DominanceComparator(),
     )
 
@@ -4,7 +4,7 @@ from jmetal.operator.mutation import NonUniformMutation
 from jmetal.problem import ZDT1
 from jmetal.util.archive import CrowdingDistanceArchive
 from jmetal.util.termination_criterion import StoppingByEvaluations
-from problem import Rastrigin, Sphere, Schwefel, Schaffer
+from problem import Rastrigin, Sphere, Schwefel, Schaffer, BatchEvaluator
 from jmetal.util.observer import Observer, VisualizerObserver
 import matplotlib.pyplot as plt
 import time
@@ -62,7 +62,8 @@ def solve(problem, swarm_size, maxNumberOfFitnessEvaluations):
                                                 max_iterations=int(maxNumberOfFitnessEvaluations / swarm_size)),
         leaders=CrowdingDistanceArchive(100),
         termination_criterion=StoppingByEvaluations(
-            max_evaluations=maxNumberOfFitnessEvaluations)
+            max_evaluations=maxNumberOfFitnessEvaluations),
+        swarm_evaluator=BatchEvaluator()
     )
     data = [[], []]
     algorithm.observable.register(observer=PrintObjectivesObserver(100, data))
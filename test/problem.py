@@ -1,7 +1,33 @@
+from typing import List
+
 import numpy as np
 
 from jmetal.core.problem import FloatProblem
 from jmetal.core.solution import FloatSolution
+from jmetal.util.evaluator import Evaluator
+
+from rastrigin import rastrigin_batch
+from sphere import sphere_batch
+from schwefel import schwefel_batch
+from schaffer import schaffer_batch
+
+
+class BatchEvaluator(Evaluator[FloatSolution]):
+    """Evaluates a whole list of solutions with one call to the problem's
+    vectorized ``evaluate_batch``."""
+
+    def evaluate(self, solution_list: List[FloatSolution], problem: FloatProblem) -> List[FloatSolution]:
+        if solution_list:
+            problem.evaluate_batch(solution_list)
+
+        return solution_list
+
+
+def _assign_objectives(solutions: List[FloatSolution], objectives: np.ndarray) -> List[FloatSolution]:
+    for solution, objective in zip(solutions, objectives):
+        solution.objectives[0] = float(objective)
+
+    return solutions
 
 
 class Sphere(FloatProblem):
@@ -27,9 +53,12 @@ class Sphere(FloatProblem):
         return len(self.lower_bound)
 
     def evaluate(self, solution: FloatSolution) -> FloatSolution:
-        solution.objectives[0] = np.sum([xi ** 2 for xi in solution.variables])
+        return self.evaluate_batch([solution])[0]
 
-        return solution
+    def evaluate_batch(self, solutions: List[FloatSolution]) -> List[FloatSolution]:
+        x = np.array([solution.variables for solution in solutions])
+
+        return _assign_objectives(solutions, sphere_batch(x))
 
     def name(self) -> str:
         return "Sphere"
@@ -58,12 +87,12 @@ class Rastrigin(FloatProblem):
         return len(self.lower_bound)
 
     def evaluate(self, solution: FloatSolution) -> FloatSolution:
-        a = 10.0
+        return self.evaluate_batch([solution])[0]
 
-        solution.objectives[0] = a * len(solution.variables) + np.sum(
-            [(xi ** 2 - a * np.cos(2 * np.pi * xi)) for xi in solution.variables])
+    def evaluate_batch(self, solutions: List[FloatSolution]) -> List[FloatSolution]:
+        x = np.array([solution.variables for solution in solutions])
 
-        return solution
+        return _assign_objectives(solutions, rastrigin_batch(x, a=10.0))
 
     def name(self) -> str:
         return "Rastrigin"
@@ -92,10 +121,12 @@ class Schwefel(FloatProblem):
         return len(self.lower_bound)
 
     def evaluate(self, solution: FloatSolution) -> FloatSolution:
-        solution.objectives[0] = 418.9829 * len(solution.variables) - np.sum([(x_i * np.sin(np.sqrt(np.abs(x_i))))
-                                                                              for x_i in solution.variables])
+        return self.evaluate_batch([solution])[0]
+
+    def evaluate_batch(self, solutions: List[FloatSolution]) -> List[FloatSolution]:
+        x = np.array([solution.variables for solution in solutions])
 
-        return solution
+        return _assign_objectives(solutions, schwefel_batch(x))
 
     def name(self) -> str:
         return "Schwefel"
@@ -124,17 +155,12 @@ class Schaffer(FloatProblem):
         return len(self.lower_bound)
 
     def evaluate(self, solution: FloatSolution) -> FloatSolution:
-        if len(solution.variables) == 0:
-            x, y = 0, 0
-        elif len(solution.variables) == 1:
-            x, y = solution.variables[0], 0
-        else:
-            x, y = solution.variables[0], solution.variables[1]
+        return self.evaluate_batch([solution])[0]
 
-        solution.objectives[0] = 0.5 + (np.square(np.sin(np.square(x)-np.square(
-            y))) - 0.5)/np.square(1+0.001*(np.square(x)+np.square(y)))
+    def evaluate_batch(self, solutions: List[FloatSolution]) -> List[FloatSolution]:
+        x = np.array([solution.variables for solution in solutions]).reshape(len(solutions), -1)
 
-        return solution
+        return _assign_objectives(solutions, schaffer_batch(x))
 
     def name(self) -> str:
         return "Schaffer"
@@ -8,8 +8,12 @@ funcName = "Rastrigin"
 
 
 def rastrigin(x, a=10):
-    dim = len(x)
-    return a * dim + np.sum([(xi ** 2 - a * np.cos(2 * np.pi * xi)) for xi in x])
+    return rastrigin_batch(np.asarray(x, dtype=float)[np.newaxis], a)[0]
+
+
+def rastrigin_batch(x, a=10):
+    x = np.asarray(x, dtype=float)
+    return a * x.shape[1] + np.sum(x ** 2 - a * np.cos(2 * np.pi * x), axis=1)
 
 
 def generate_points(min_val, max_val, num_points):
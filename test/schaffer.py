@@ -18,6 +18,14 @@ def schaffer(x):
     return 0.5 + (np.square(np.sin(np.square(x) - np.square(y))) - 0.5) / np.square(1 + 0.001 * (np.square(x) + np.square(y)))
 
 
+def schaffer_batch(x):
+    x = np.asarray(x, dtype=float)
+    if x.shape[1] < 2:
+        x = np.hstack([x, np.zeros((len(x), 2 - x.shape[1]))])
+
+    return schaffer(x.T)
+
+
 def generate_points(min_val, max_val, num_points):
     return np.linspace(min_val, max_val, num_points)
 
@@ -8,8 +8,12 @@ funcName = "Schwefel"
 
 
 def schwefel(x):
-    dim = len(x)
-    return 418.9829 * dim - np.sum([(x_i * np.sin(np.sqrt(np.abs(x_i)))) for x_i in x])
+    return schwefel_batch(np.asarray(x, dtype=float)[np.newaxis])[0]
+
+
+def schwefel_batch(x):
+    x = np.asarray(x, dtype=float)
+    return 418.9829 * x.shape[1] - np.sum(x * np.sin(np.sqrt(np.abs(x))), axis=1)
 
 
 def generate_points(min_val, max_val, num_points):
@@ -1,7 +1,7 @@
 from jmetal.algorithm.multiobjective.smpso import SMPSO
 from jmetal.util.archive import CrowdingDistanceArchive
 from jmetal.util.termination_criterion import StoppingByEvaluations
-from problem import Rastrigin, Sphere, Schwefel, Schaffer
+from problem import Rastrigin, Sphere, Schwefel, Schaffer, BatchEvaluator
 from jmetal.util.observer import Observer, VisualizerObserver
 import matplotlib.pyplot as plt
 import time
@@ -56,7 +56,8 @@ def solve(problem, swarm_size, maxNumberOfFitnessEvaluations):
             probability=1.0 / problem.number_of_variables(), distribution_index=20),
         leaders=CrowdingDistanceArchive(100),
         termination_criterion=StoppingByEvaluations(
-            max_evaluations=maxNumberOfFitnessEvaluations)
+            max_evaluations=maxNumberOfFitnessEvaluations),
+        swarm_evaluator=BatchEvaluator()
     )
     data = [[], []]
     algorithm.observable.register(observer=PrintObjectivesObserver(100, data))
@@ -1,6 +1,6 @@
 from jmetal.algorithm.multiobjective.spea2 import SPEA2
 from jmetal.operator import SBXCrossover, PolynomialMutation
-from problem import Rastrigin, Sphere, Schwefel, Schaffer
+from problem import Rastrigin, Sphere, Schwefel, Schaffer, BatchEvaluator
 from jmetal.util.termination_criterion import StoppingByEvaluations
 from jmetal.util.observer import Observer
 import matplotlib.pyplot as plt
@@ -56,7 +56,8 @@ def solve(problem, numberOfAgents, maxNumberOfFitnessEvaluations):
             probability=1.0 / problem.number_of_variables(), distribution_index=20),
         crossover=SBXCrossover(probability=1.0, distribution_index=20),
         termination_criterion=StoppingByEvaluations(
-            max_evaluations=maxNumberOfFitnessEvaluations)
+            max_evaluations=maxNumberOfFitnessEvaluations),
+        population_evaluator=BatchEvaluator()
     )
     data = [[], []]
     algorithm.observable.register(observer=PrintObjectivesObserver(100, data))
@@ -8,7 +8,12 @@ funcName = "Sphere"
 
 
 def sphere(x):
-    return np.sum([xi ** 2 for xi in x])
+    return sphere_batch(np.asarray(x, dtype=float)[np.newaxis])[0]
+
+
+def sphere_batch(x):
+    x = np.asarray(x, dtype=float)
+    return np.sum(x ** 2, axis=1)
 
 
 def generate_points(min_val, max_val, num_points):
@@ -1,11 +1,20 @@
+import hashlib
+import inspect
 import json
 import time
 import os
-from threading import Thread
+import random
+import shutil
 
+import matplotlib
 import numpy as np
 
+# figures are only saved to files, also by the report workers
+matplotlib.use("Agg")
+
 import emas
+from cache import ResultCache, source_hash
+from trajectories import TrajectoryStore, write_trajectories
 import evolution_strategy
 import gde3
 import genetic_algorithm
@@ -32,7 +41,7 @@ from schaffer import schaffer
 from schaffer import LB as schaffer_LB
 from schaffer import UB as schaffer_UB
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import logging
 
@@ -64,6 +73,14 @@ MAX_FITNESS_EVALS = 5000
 AMOUNT_OF_BOXPLOTS = 13  # from 1 to MAX_FITNESS_EVALS//100
 RESULTS_DIR = 'results'
 PLOTS_DIR = 'plots'
+# mean run time of every algorithm on every function measured by the last
+# campaign, used to schedule the longest jobs first
+TIMINGS_FILE = os.path.join(RESULTS_DIR, 'timings.json')
+# finished cells, re-runs only compute the cells missing from it
+CACHE_DIR = os.path.join(RESULTS_DIR, 'cache')
+# test i of every algorithm and function runs with seed CAMPAIGN_SEED + i
+CAMPAIGN_SEED = 0
+NUM_WORKERS = os.cpu_count() or 1
 
 # Initialize results and threads structures
 results = [
@@ -78,50 +95,109 @@ results = [
     }
     for alg in algorithms
 ]
-threads = [
-    {
-        "name": alg.__name__,
-        "functions": [
-            {"name": function["func"].__name__, "threads": [None] * NUM_TESTS}
-            for function in functions
-        ]
-    }
-    for alg in algorithms
-]
+
+
+def cell_key(alg_idx, func_idx, test_idx, code_hashes):
+    algorithm, function = algorithms[alg_idx], functions[func_idx]
+    return ResultCache.key(
+        algorithm=algorithm.__name__, function=function["func"].__name__,
+        dimensions=function["dim"], LB=function["LB"], UB=function["UB"],
+        budget=MAX_FITNESS_EVALS, agents=NUM_AGENTS, seed=CAMPAIGN_SEED + test_idx,
+        code=code_hashes[alg_idx], config=getattr(algorithm, "settings", None))
 
 
 # Function to run an algorithm
-def run_algorithm(algorithm, function, LB, UB, dimensions, num_agents, max_fitness_evals, results, alg_idx, function_idx, test_idx):
+def run_algorithm(alg_idx, func_idx, test_idx, key):
+    algorithm, function = algorithms[alg_idx], functions[func_idx]
     print(
-        f"Starting {algorithm.__name__} on {function.__name__} test {test_idx+1}/{NUM_TESTS}")
+        f"Starting {algorithm.__name__} on {function['func'].__name__} test {test_idx+1}/{NUM_TESTS}")
+    # algorithms owning their generator get the seed, the others use the
+    # global ones
+    seed = CAMPAIGN_SEED + test_idx
+    random.seed(seed)
+    np.random.seed(seed)
+    kwargs = {"seed": seed} if "seed" in inspect.signature(algorithm.run).parameters else {}
     start_time = time.time()
-    result = algorithm.run(dimensions, function, LB, UB,
-                           num_agents, max_fitness_evals)
+    result = algorithm.run(function["dim"], function["func"], function["LB"], function["UB"],
+                           NUM_AGENTS, MAX_FITNESS_EVALS, **kwargs)
     end_time = time.time()
+    print(f"Finished {algorithm.__name__} on {function['func'].__name__} test {test_idx+1}/{NUM_TESTS} in {round(end_time-start_time, 2)} seconds")
+
+    ResultCache(CACHE_DIR).put(key, {"result": result, "time": end_time - start_time})
+    return alg_idx, func_idx, test_idx, result, end_time - start_time
+
+
+def run_chunk(jobs):
+    return [run_algorithm(*job) for job in jobs]
+
+
+def load_timings():
+    try:
+        with open(TIMINGS_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def estimate_time(timings, alg_idx, func_idx):
+    # without measurements jobs are ordered by their dimensions
+    key = f'{algorithms[alg_idx].__name__}/{functions[func_idx]["func"].__name__}'
+    return timings.get(key, functions[func_idx]["dim"] * MAX_FITNESS_EVALS * 1e-6)
+
+
+def schedule_jobs(jobs, timings, num_workers):
+    """Chunks of (alg_idx, func_idx, test_idx, key) jobs, longest jobs first.
+
+    A chunk holds consecutive jobs of the sorted list, so it is roughly as
+    long as each of its jobs times its size, and there are about four
+    chunks per worker to even out the end of the campaign."""
+    jobs = sorted(jobs, key=lambda job: estimate_time(timings, job[0], job[1]), reverse=True)
+
+    chunk_size = max(1, len(jobs) // (4 * num_workers))
+    return [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+
+def store_result(alg_idx, func_idx, test_idx, result):
     results[alg_idx]["labels"] = result[0]
-    results[alg_idx]["functions"][function_idx]["results"][test_idx] = result[1]
-    print(f"Finished {algorithm.__name__} on {function.__name__} test {test_idx+1}/{NUM_TESTS} in {round(end_time-start_time, 2)} seconds")
+    results[alg_idx]["functions"][func_idx]["results"][test_idx] = result[1]
 
 
 def perform_calculations(run_id):
-    num_algorithms = len(algorithms)
-    num_functions = len(functions)
-    max_workers = num_algorithms * num_functions * NUM_TESTS
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_test = {}
-        for alg_idx, algorithm in enumerate(algorithms):
-            for func_idx, function in enumerate(functions):
-                for test_idx in range(NUM_TESTS):
-                    future = executor.submit(run_algorithm, algorithm,
-                                             function["func"], function["LB"], function["UB"],
-                                             function["dim"], NUM_AGENTS, MAX_FITNESS_EVALS,
-                                             results,
-                                             alg_idx, func_idx, test_idx)
-                    future_to_test[future] = (alg_idx, func_idx, test_idx)
-
-        for future in future_to_test:
-            future.result()
+    timings = load_timings()
+    measured = {}
+
+    cache = ResultCache(CACHE_DIR)
+    code_hashes = [source_hash(algorithm) for algorithm in algorithms]
+    missing = []
+    for alg_idx in range(len(algorithms)):
+        for func_idx in range(len(functions)):
+            for test_idx in range(NUM_TESTS):
+                key = cell_key(alg_idx, func_idx, test_idx, code_hashes)
+                cached = cache.get(key)
+                if cached is None:
+                    missing.append((alg_idx, func_idx, test_idx, key))
+                else:
+                    store_result(alg_idx, func_idx, test_idx, cached["result"])
+    print(f"{len(missing)} of {len(algorithms) * len(functions) * NUM_TESTS} tests are not cached")
+
+    with ProcessPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        futures = [executor.submit(run_chunk, chunk)
+                   for chunk in schedule_jobs(missing, timings, NUM_WORKERS)]
+
+        # results are streamed back and stored by the main process only
+        for future in as_completed(futures):
+            for alg_idx, func_idx, test_idx, result, elapsed in future.result():
+                store_result(alg_idx, func_idx, test_idx, result)
+
+                key = f'{algorithms[alg_idx].__name__}/{functions[func_idx]["func"].__name__}'
+                measured.setdefault(key, []).append(elapsed)
+
+    timings.update({key: float(np.mean(times)) for key, times in measured.items()})
+    try:
+        with open(TIMINGS_FILE, 'w') as file:
+            json.dump(timings, file, indent=4)
+    except Exception as e:
+        print(f"Error while saving timings to file {TIMINGS_FILE}: {e}")
 
     # Calculate average results
     for algorithm in results:
@@ -129,74 +205,57 @@ def perform_calculations(run_id):
             function["avg"] = list(np.average(
                 np.array(function["results"]), axis=0))
 
-    # Save results to files
-    for algorithm in results:
-        file_path = os.path.join(
-            RESULTS_DIR, f'{run_id}_{algorithm["name"]}.json')
-        try:
-            with open(file_path, 'w') as file:
-                json.dump(algorithm, file, indent=4)
-        except Exception as e:
-            print(f"Error while saving results to file {file_path}: {e}")
+    # Save results to file
+    file_path = os.path.join(RESULTS_DIR, f'{run_id}_trajectories')
+    try:
+        write_trajectories(file_path, results)
+    except Exception as e:
+        print(f"Error while saving results to file {file_path}: {e}")
 
 
-def plot_results(run_id, labels, results, avg, alg_name, func_name, every_nth_box=math.ceil((MAX_FITNESS_EVALS//100)/AMOUNT_OF_BOXPLOTS)):
-    fig, ax = plt.subplots()
+EVERY_NTH_BOX = math.ceil((MAX_FITNESS_EVALS//100)/AMOUNT_OF_BOXPLOTS)
 
-    box_data_x = np.array(labels)
-    box_data_y = np.array(results)
-    box_avg_y = np.array(avg)
 
-    ax.plot(box_data_x, box_avg_y, label="Average")
-    ax.boxplot(list(box_data_y.T[::every_nth_box]), positions=list(box_data_x[::every_nth_box]), widths=[
-               MAX_FITNESS_EVALS*0.03 for _ in range(math.ceil((MAX_FITNESS_EVALS/100)/every_nth_box))])
+def plot_results(file_path, store, alg_name, func_name, every_nth_box=EVERY_NTH_BOX):
+    # runs has shape (checkpoints, runs), only every nth checkpoint is read
+    labels = store.labels(alg_name)
+    runs = store.runs(alg_name, func_name)
+    fig, ax = plt.subplots()
+    try:
+        ax.plot(labels, store.average(alg_name, func_name), label="Average")
+        ax.boxplot(list(runs[::every_nth_box]), positions=list(labels[::every_nth_box]), widths=[
+                   MAX_FITNESS_EVALS*0.03 for _ in range(math.ceil((MAX_FITNESS_EVALS/100)/every_nth_box))])
 
-    ax.set_title(f"{alg_name} for function {func_name}")
-    ax.set_xlabel("Number of fitness evaluations")
-    ax.set_ylabel("Fitness")
-    # ax.legend()
+        ax.set_title(f"{alg_name} for function {func_name}")
+        ax.set_xlabel("Number of fitness evaluations")
+        ax.set_ylabel("Fitness")
+        # ax.legend()
 
-    # plt.show()
-    file_path = os.path.join(
-        PLOTS_DIR, f'{run_id}_plot_{alg_name}_{func_name}.png')
-    plt.savefig(file_path)
+        # plt.show()
+        fig.savefig(file_path)
+    finally:
+        plt.close(fig)
 
 
-def plot_comparison(run_id, results, every_nth_box=math.ceil((MAX_FITNESS_EVALS//100)/AMOUNT_OF_BOXPLOTS)):
-    # 3D array of results:
-    #         func1 func2 func3 func4
-    # alg1: [  [lbs],   [],   [],   [] ] = row_of_functions
-    # alg2: [  [lbs],   [],   [],   [] ]
-    # alg3: [  [lbs],   [],   [],   [] ]
-    # alg4: [  [lbs],   [],   [],   [] ]
+def comparison_data(store, func_name):
+    # 2D array of average results for the function
+    #         func
+    # alg1:   [labels]
+    # alg2:   [labels]
     # ... ...
-    # alg8: [  [lbs],   [],   [],   [] ]
-    #
-    # lbs := labels
-
-    for func_idx, function in enumerate(functions):
-        # 2D array of results for every function {func1,... func4}
-        #         func
-        # alg1:   [labels]
-        # alg2:   [labels]
-        # alg3:   [labels]
-        # alg4:   [labels]
-        # ... ...
-        # alg8:   [labels]
-        #
-        # lbs := labels
-        func_name = function["func"].__name__
-        labels = np.array(results[0]["labels"])
-        fig, ax = plt.subplots()
-        avg_results = []
-
-        for algorithm in results:
-            alg_results = np.array(
-                [function["avg"] for function in algorithm["functions"] if function["name"] == func_name])
-            avg_results.append(alg_results)
-            ax.plot(labels, alg_results[0], label=algorithm["name"])
-
-        avg_results = np.vstack(avg_results)
+    # alg8:   [labels]
+    labels = np.array(store.labels(store.algorithms[0]))
+    avg_results = np.vstack([store.average(alg_name, func_name)
+                            for alg_name in store.algorithms])
+    return labels, avg_results
+
+
+def plot_comparison_all(file_path, store, func_name, every_nth_box=EVERY_NTH_BOX):
+    labels, avg_results = comparison_data(store, func_name)
+    fig, ax = plt.subplots()
+    try:
+        for alg_name, alg_results in zip(store.algorithms, avg_results):
+            ax.plot(labels, alg_results, label=alg_name)
 
         ax.boxplot(list(avg_results.T[::every_nth_box]), positions=list(labels[::every_nth_box]), widths=[
             MAX_FITNESS_EVALS*0.03 for _ in range(len(labels[::every_nth_box]))
@@ -206,13 +265,16 @@ def plot_comparison(run_id, results, every_nth_box=math.ceil((MAX_FITNESS_EVALS/
         ax.set_ylabel("Fitness")
         ax.legend(fontsize="6", loc="upper right")
 
-        file_path = os.path.join(
-            PLOTS_DIR, f'{run_id}_plot_comparison_all_{func_name}.png')
-        plt.savefig(file_path)
+        fig.savefig(file_path)
+    finally:
         plt.close(fig)
 
-        # Plot the average of all algorithms
-        fig, ax = plt.subplots()
+
+def plot_comparison_avg(file_path, store, func_name, every_nth_box=EVERY_NTH_BOX):
+    # Plot the average of all algorithms
+    labels, avg_results = comparison_data(store, func_name)
+    fig, ax = plt.subplots()
+    try:
         ax.plot(labels, np.mean(avg_results, axis=0),
                 label="Average of algorithms")
         ax.boxplot(list(avg_results.T[::every_nth_box]), positions=list(labels[::every_nth_box]), widths=[
@@ -223,28 +285,106 @@ def plot_comparison(run_id, results, every_nth_box=math.ceil((MAX_FITNESS_EVALS/
         ax.set_ylabel("Fitness")
         ax.legend(fontsize="6", loc="upper right")
 
-        file_path = os.path.join(
-            PLOTS_DIR, f'{run_id}_plot_comparison_avg_{func_name}.png')
-        plt.savefig(file_path)
+        fig.savefig(file_path)
+    finally:
         plt.close(fig)
 
-        for algorithm in results:
-            fig, ax = plt.subplots()
-            row = np.array(
-                [function["avg"] for function in algorithm["functions"] if function["name"] == func_name])
-
-            ax.plot(labels, row[0], label="Average of algor ithms")
-            ax.boxplot(list(avg_results.T[::every_nth_box]), positions=list(labels[::every_nth_box]), widths=[
-                       MAX_FITNESS_EVALS*0.03 for _ in range(math.ceil((MAX_FITNESS_EVALS/100)/every_nth_box))])
-            ax.set_title("Comparison of algorithms for func: " +
-                         func_name+" for algo: "+algorithm["name"])
-            ax.set_xlabel("Number of fitness evaluations")
-            ax.set_ylabel("Fitness")
-            ax.legend(fontsize="6", loc="upper right")
-            file_path = os.path.join(
-                PLOTS_DIR, f'{run_id}_plot_comparison_avg_{func_name}_alg_{algorithm["name"]}.png')
-            plt.savefig(file_path)
-            plt.close(fig)
+
+def plot_comparison_alg(file_path, store, func_name, alg_name, every_nth_box=EVERY_NTH_BOX):
+    labels, avg_results = comparison_data(store, func_name)
+    fig, ax = plt.subplots()
+    try:
+        ax.plot(labels, store.average(alg_name, func_name), label="Average of algor ithms")
+        ax.boxplot(list(avg_results.T[::every_nth_box]), positions=list(labels[::every_nth_box]), widths=[
+                   MAX_FITNESS_EVALS*0.03 for _ in range(math.ceil((MAX_FITNESS_EVALS/100)/every_nth_box))])
+        ax.set_title("Comparison of algorithms for func: " +
+                     func_name+" for algo: "+alg_name)
+        ax.set_xlabel("Number of fitness evaluations")
+        ax.set_ylabel("Fitness")
+        ax.legend(fontsize="6", loc="upper right")
+
+        fig.savefig(file_path)
+    finally:
+        plt.close(fig)
+
+
+def report_tasks(run_id, store):
+    """(file_path, plot_name, args, input arrays) of every plot of a run."""
+    for alg_name in store.algorithms:
+        for func_name in store.functions:
+            yield (os.path.join(PLOTS_DIR, f'{run_id}_plot_{alg_name}_{func_name}.png'),
+                   "plot_results", (alg_name, func_name),
+                   [store.labels(alg_name), store.runs(alg_name, func_name),
+                    store.average(alg_name, func_name)])
+
+    for func_name in store.functions:
+        inputs = [store.labels(store.algorithms[0])] + \
+            [store.average(alg_name, func_name) for alg_name in store.algorithms]
+        yield (os.path.join(PLOTS_DIR, f'{run_id}_plot_comparison_all_{func_name}.png'),
+               "plot_comparison_all", (func_name,), inputs)
+        yield (os.path.join(PLOTS_DIR, f'{run_id}_plot_comparison_avg_{func_name}.png'),
+               "plot_comparison_avg", (func_name,), inputs)
+        for alg_name in store.algorithms:
+            yield (os.path.join(PLOTS_DIR, f'{run_id}_plot_comparison_avg_{func_name}_alg_{alg_name}.png'),
+                   "plot_comparison_alg", (func_name, alg_name), inputs)
+
+
+def plot_hash(plot_name, args, inputs):
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(globals()[plot_name]).encode())
+    digest.update(inspect.getsource(comparison_data).encode())
+    digest.update(repr((args, MAX_FITNESS_EVALS, EVERY_NTH_BOX, [array.shape for array in inputs])).encode())
+    for array in inputs:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def render_plot(store_path, plot_name, file_path, args):
+    globals()[plot_name](file_path, TrajectoryStore(store_path), *args)
+
+
+def render_report(run_id, num_workers=NUM_WORKERS):
+    """Render the plots of a run on a process pool.
+
+    Plots are skipped when a plot with the same input hash (plotting code,
+    arguments and data) was rendered before, the earlier file is copied
+    instead. Hashes of rendered plots are kept in PLOTS_DIR/index.json."""
+    store_path = os.path.join(RESULTS_DIR, f'{run_id}_trajectories')
+    store = TrajectoryStore(store_path)
+
+    index_path = os.path.join(PLOTS_DIR, 'index.json')
+    try:
+        with open(index_path) as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        index = {}
+
+    tasks = []
+    for file_path, plot_name, args, inputs in report_tasks(run_id, store):
+        input_hash = plot_hash(plot_name, args, inputs)
+        rendered = index.get(input_hash)
+        if rendered is not None and os.path.exists(rendered):
+            if rendered != file_path:
+                shutil.copyfile(rendered, file_path)
+            continue
+        tasks.append((file_path, plot_name, args, input_hash))
+    print(f"Rendering {len(tasks)} plots")
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {executor.submit(render_plot, store_path, plot_name, file_path, args): (file_path, input_hash)
+                   for file_path, plot_name, args, input_hash in tasks}
+        for future in as_completed(futures):
+            file_path, input_hash = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error while rendering plot {file_path}: {e}")
+                continue
+            index[input_hash] = file_path
+
+    with open(index_path + '.tmp', 'w') as file:
+        json.dump(index, file, indent=4)
+    os.replace(index_path + '.tmp', index_path)
 
 
 if __name__ == "__main__":
@@ -254,10 +394,4 @@ if __name__ == "__main__":
     os.makedirs(PLOTS_DIR, exist_ok=True)
 
     perform_calculations(run_id)
-
-    for algorithmn in results:
-        for function in algorithmn["functions"]:
-            plot_results(run_id, algorithmn["labels"], function["results"],
-                         function["avg"], algorithmn["name"], function["name"])
-
-    plot_comparison(run_id, results)
+    render_report(run_id)
@@ -0,0 +1,76 @@
+import json
+import os
+
+import numpy as np
+
+DTYPE = np.float64
+
+
+def write_trajectories(path, results):
+    """Store the campaign ``results`` as ``<path>.bin`` and ``<path>.json``.
+
+    The binary file holds, one after another, the labels of every algorithm
+    and the ``(checkpoints, runs)`` matrix and average trajectory of every
+    algorithm and function. The JSON manifest gives the offset and shape of
+    each of these arrays."""
+    arrays = {}
+    offset = 0
+    with open(path + '.bin.tmp', 'wb') as file:
+        def write(name, array):
+            nonlocal offset
+            array = np.ascontiguousarray(array, dtype=DTYPE)
+            file.write(array.tobytes())
+            arrays[name] = {"offset": offset, "shape": list(array.shape)}
+            offset += array.nbytes
+
+        for algorithm in results:
+            write(f'{algorithm["name"]}/labels', algorithm["labels"])
+            for function in algorithm["functions"]:
+                write(f'{algorithm["name"]}/{function["name"]}/runs', np.array(function["results"]).T)
+                write(f'{algorithm["name"]}/{function["name"]}/avg', function["avg"])
+
+    manifest = {
+        "data": os.path.basename(path) + '.bin',
+        "dtype": np.dtype(DTYPE).str,
+        "algorithms": [algorithm["name"] for algorithm in results],
+        "functions": [function["name"] for function in results[0]["functions"]] if results else [],
+        "arrays": arrays
+    }
+    os.replace(path + '.bin.tmp', path + '.bin')
+    with open(path + '.json.tmp', 'w') as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(path + '.json.tmp', path + '.json')
+
+
+class TrajectoryStore:
+    """Read access to trajectories written by ``write_trajectories``.
+
+    Arrays are memory-mapped views, so slicing them reads only the
+    checkpoints that are used."""
+
+    def __init__(self, path):
+        with open(path + '.json') as file:
+            manifest = json.load(file)
+
+        self.algorithms = manifest["algorithms"]
+        self.functions = manifest["functions"]
+        self.arrays = manifest["arrays"]
+        self.dtype = np.dtype(manifest["dtype"])
+        self.data_path = os.path.join(os.path.dirname(path), manifest["data"])
+
+    def _array(self, name):
+        array = self.arrays[name]
+        if 0 in array["shape"]:
+            return np.empty(array["shape"], dtype=self.dtype)
+        return np.memmap(self.data_path, dtype=self.dtype, mode='r',
+                         offset=array["offset"], shape=tuple(array["shape"]))
+
+    def labels(self, algorithm):
+        return self._array(f'{algorithm}/labels')
+
+    def runs(self, algorithm, function):
+        """Fitness of every run at every checkpoint, of shape (checkpoints, runs)."""
+        return self._array(f'{algorithm}/{function}/runs')
+
+    def average(self, algorithm, function):
+        return self._array(f'{algorithm}/{function}/avg')